@@ -0,0 +1,79 @@
+'''
+    Latency of one dashboard count with each query backend of the cube
+    (see pages/utils/cube.py), against the filter and groupby over the
+    rows (`count_by`), on the accident data replicated 1x, 10x and 100x.
+
+    The query is the one behind the dashboard main chart: year and
+    severity filters, then counts per weather condition and severity.
+    The cube backend is timed on a cold query, which builds the cuboid,
+    and on a warm one; the DuckDB backend keeps no state between
+    queries. Only the columns the query reads are replicated, so that
+    the 100x table fits in memory.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_backends
+'''
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.rows import count_by
+from pages.utils.cube import Cube
+from pages.utils.dataset import load_dataset
+
+SCALES = [1, 10, 100]
+REPEATS = 5
+COLUMNS = ['AN', 'GRAVITE', 'CD_COND_METEO', 'CD_ETAT_SURFC']
+BY = ['CD_COND_METEO', 'GRAVITE']
+FILTERS = {'AN': 2019, 'GRAVITE': 'Léger', 'CD_ETAT_SURFC': None}
+
+
+def replicate(df, scale):
+    '''
+    Stacks `scale` copies of `df`, keeping its compact dtypes.
+    '''
+    if scale == 1:
+        return df
+    return pd.concat([df] * scale, ignore_index=True)
+
+
+def median_ms(run):
+    '''
+    Returns:
+        tuple: Median latency of `run`, in ms, and its last result
+    '''
+    latencies = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = run()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.median(latencies), result
+
+
+def main():
+    base = load_dataset()[COLUMNS]
+    print(f'{"rows":>12} | {"rows groupby":>12} {"cube cold":>10} {"cube warm":>10} {"duckdb":>9}')
+    for scale in SCALES:
+        df = replicate(base, scale)
+        rows, expected = median_ms(lambda: count_by(df, BY, FILTERS))
+        cube = Cube(df, COLUMNS, backend='cube')
+
+        def cold():
+            # Drop the cuboid of the previous run, so that each run builds it
+            cube._cuboids.clear()
+            return cube.count(BY, FILTERS)
+
+        cold_ms, _ = median_ms(cold)
+        warm_ms, counts = median_ms(lambda: cube.count(BY, FILTERS))
+        database = Cube(df, COLUMNS, backend='duckdb')
+        duckdb_ms, queried = median_ms(lambda: database.count(BY, FILTERS))
+        # Every path must agree on the counts
+        assert np.array_equal(counts['count'], expected['count'])
+        assert counts.equals(queried)
+        print(f'{len(df):>12,} | {rows:>10.1f}ms {cold_ms:>8.1f}ms {warm_ms:>8.2f}ms {duckdb_ms:>7.1f}ms')
+        del df, cube, database
+
+
+if __name__ == '__main__':
+    main()
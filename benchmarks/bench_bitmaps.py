@@ -0,0 +1,56 @@
+'''
+    Filter latency of the bitmap index against boolean masks over the
+    rows (`filter_mask`), as the dashboard filters are turned on one by
+    one.
+
+    The index is built on the coded columns of the shared table; the
+    dashboard indexes their labelled versions, with the same bitmaps.
+    Each filter keeps the most frequent value of its column in the year.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_bitmaps
+'''
+import time
+
+import numpy as np
+
+from benchmarks.rows import filter_mask
+from pages.utils.bitmaps import BitmapIndex, popcount
+from pages.utils.dataset import load_dataset, load_partitions
+
+COLUMNS = ['AN', 'GRAVITE', 'CD_COND_METEO', 'CD_ETAT_SURFC', 'CD_ENVRN_ACCDN',
+           'CD_ASPCT_ROUTE', 'CD_ZON_TRAVX_ROUTR']
+REPEATS = 50
+
+
+def median_ms(run):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def main():
+    df = load_dataset()
+    start = time.perf_counter()
+    index = BitmapIndex(df, COLUMNS)
+    print(f'Index of {len(df):,} rows, {sum(map(len, index.bitmaps.values()))} bitmaps, '
+          f'built in {(time.perf_counter() - start) * 1000:.0f}ms')
+    year = max(load_partitions())
+    rows = df[df['AN'] == year]
+    values = {'AN': year, **{column: rows[column].mode().iloc[0] for column in COLUMNS[1:]}}
+
+    print(f'{"filters":>7} {"matches":>8} | {"masks":>7} {"bitmaps":>8}')
+    for active in range(len(COLUMNS) + 1):
+        filters = {column: values[column] for column in COLUMNS[:active]}
+        matches = popcount(index.match(filters))
+        assert matches == int(np.count_nonzero(filter_mask(df, filters)))
+        masks = median_ms(lambda: np.count_nonzero(filter_mask(df, filters)))
+        bitmaps = median_ms(lambda: popcount(index.match(filters)))
+        print(f'{active:>7} {matches:>8,} | {masks:>5.2f}ms {bitmaps:>6.3f}ms')
+
+
+if __name__ == '__main__':
+    main()
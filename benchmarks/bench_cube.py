@@ -0,0 +1,75 @@
+'''
+    Latency of the chart queries answered by the cube, against the same
+    counts over the rows with `count_by`.
+
+    Reports the time to build the cube, then for each query the time of
+    its first run (which builds its cuboid), its median time once the
+    cuboid exists, and the median time of `count_by`. Then the same for
+    a dashboard query over ranges of years, read from the cumulative
+    counts of `Cube.span`.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_cube
+'''
+import time
+
+from benchmarks.rows import count_by
+from pages.utils.cube import Cube
+from pages.utils.dataset import load_dataset, load_partitions
+
+REPEATS = 200
+
+
+def queries(year):
+    '''
+    Returns:
+        dict: Name to (by, filters) of queries the pages run
+    '''
+    return {
+        'dashboard weather': (['CD_COND_METEO', 'GRAVITE'], {'AN': year}),
+        'dashboard heatmap': (['CD_COND_METEO', 'CD_ETAT_SURFC', 'GRAVITE'], {'AN': year, 'CD_ENVRN_ACCDN': 5}),
+        'dashboard map': (['REG_ADM', 'GRAVITE', 'CD_COND_METEO'], {'AN': year}),
+        'covid trend': (['AN', 'GRAVITE'], {}),
+        'month heatmap': (['REG_ADM', 'MS_ACCDN'], {'GRAVITE': 'Mortel ou grave'}),
+        'severity by time': (['MS_ACCDN', 'JR_SEMN_ACCDN', 'HR_ACCDN', 'GRAVITE'], {}),
+        'sankey': (['CD_CONFG_ROUTE', 'GRAVITE'], {}),
+        'polar': (['CD_ECLRM', 'CD_ETAT_SURFC'], {'SEASON': 'Winter', 'SEVERE_FLAG': 'O'}),
+        'region bars': (['QUARTER_DAY', 'GRAVITE'], {'REG_ADM': 'Montréal (06)'})
+    }
+
+
+def median_ms(run, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def main():
+    df = load_dataset()
+    start = time.perf_counter()
+    cube = Cube(df)
+    print(f'Cube of {len(df):,} accidents built in {(time.perf_counter() - start) * 1000:.0f}ms')
+    year = max(load_partitions())
+    print(f'{"query":>18} | {"first":>8} {"cube":>8} | {"rows":>8}')
+    for name, (by, filters) in queries(year).items():
+        first = median_ms(lambda: cube.count(by, filters), 1)
+        warm = median_ms(lambda: cube.count(by, filters), REPEATS)
+        rows = median_ms(lambda: count_by(df, by, filters), 5)
+        print(f'{name:>18} | {first:>6.1f}ms {warm:>6.2f}ms | {rows:>6.1f}ms')
+
+    years = list(load_partitions())
+    by = ['CD_COND_METEO', 'GRAVITE']
+    for last in years:
+        filters = {'AN': (years[0], last)}
+        first = median_ms(lambda: cube.count(by, filters), 1)
+        warm = median_ms(lambda: cube.count(by, filters), REPEATS)
+        selected = df[df['AN'].between(years[0], last).to_numpy(dtype=bool, na_value=False)]
+        rows = median_ms(lambda: count_by(selected, by), 5)
+        print(f'{f"years {years[0]}-{last}":>18} | {first:>6.1f}ms {warm:>6.2f}ms | {rows:>6.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+'''
+    Repeat views with the figure cache (pages/utils/figure_cache.py):
+    the dashboard charts of every year, built from the cube on the first
+    view and read back from the cache on the next ones.
+
+    Reports, per chart, the median time of a miss (counts from the cube
+    and figure construction) and of a hit, both including the JSON
+    serialization Streamlit does when sending the figure, and the size
+    of the cached figures. Then, with a budget of a quarter of that
+    size, a view of every year followed by repeat views of the last
+    years: the least recently used figures are evicted, the recent ones
+    stay.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_figures
+'''
+import time
+
+from pages.utils.cube import Cube
+from pages.utils.dataset import load_dataset, load_partitions
+from pages.utils.figure_cache import FigureCache
+from pages.utils.region_map import bubble_map, region_bubbles
+from pages.utils.severity_chart import severity_bar_chart
+
+CHARTS = {
+    'Weather': 'CD_COND_METEO',
+    'Road Surface': 'CD_ETAT_SURFC',
+    'Lighting': 'CD_ECLRM',
+    'Environment': 'CD_ENVRN_ACCDN'
+}
+MAP_DETAILS = {'CD_COND_METEO': 'Main Weather', 'CD_ETAT_SURFC': 'Main Surface'}
+
+
+def builders(cube, year):
+    '''
+    Returns:
+        dict: Chart name to the function building its figure for `year`
+    '''
+    filters = {'AN': year}
+    charts = {chart: (lambda x=x: severity_bar_chart(cube.count([x, 'GRAVITE'], filters), x, barmode='group'))
+              for chart, x in CHARTS.items()}
+    charts['Map'] = lambda: bubble_map(region_bubbles(cube, filters, details=MAP_DETAILS).dropna(subset=['lat', 'lon']),
+                                       details=MAP_DETAILS, zoom=5, height=500)
+    return charts
+
+
+def view(cache, chart, year, build):
+    '''
+    Returns:
+        float: Time to get the figure and serialize it, in ms
+    '''
+    start = time.perf_counter()
+    cache.get((chart, year), build).to_json()
+    return (time.perf_counter() - start) * 1000
+
+
+def median(timings):
+    return sorted(timings)[len(timings) // 2]
+
+
+def main():
+    df = load_dataset()
+    cube = Cube(df)
+    years = sorted(load_partitions())
+    cache = FigureCache(budget=1 << 40)
+    views = [(year, chart, build) for year in years for chart, build in builders(cube, year).items()]
+    misses = {}
+    for year, chart, build in views:
+        misses.setdefault(chart, []).append(view(cache, chart, year, build))
+    hits = {}
+    for year, chart, build in views:
+        hits.setdefault(chart, []).append(view(cache, chart, year, build))
+    print(f'{len(years)} years, {len(cache)} figures, {cache.size / 1024:,.0f} KB cached')
+    print(f'{"chart":>14} | {"miss":>7} {"hit":>7}')
+    for chart in misses:
+        print(f'{chart:>14} | {median(misses[chart]):>5.1f}ms {median(hits[chart]):>5.1f}ms')
+
+    budget = cache.size // 4
+    small = FigureCache(budget=budget)
+    recent = [(year, chart, build) for year, chart, build in views if year in years[-max(1, len(years) // 4):]]
+    for year, chart, build in views + 3 * recent:
+        view(small, chart, year, build)
+    print(f'Budget {budget / 1024:,.0f} KB: {len(small)} figures kept ({small.size / 1024:,.0f} KB), '
+          f'{small.hits} hits and {small.misses} misses over {len(views) + 3 * len(recent)} views')
+
+
+if __name__ == '__main__':
+    main()
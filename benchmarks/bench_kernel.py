@@ -0,0 +1,78 @@
+'''
+    Multi-key counts with the bincount kernel (pages/utils/aggregate.py)
+    against `groupby(by).size()`, at the size of the data and at 10M
+    rows (the rows repeated).
+
+    The groupby runs on the columns as the pages used to read them from
+    the CSV: strings as objects, codes as numbers. The kernel is timed
+    twice: from those columns (encoding included), and from codes
+    encoded beforehand, as the cube holds them.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_kernel
+'''
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.rows import dense_counts
+from pages.utils.aggregate import count_codes, encode
+from pages.utils.dataset import load_dataset
+
+QUERIES = {
+    'month x severity': ['MS_ACCDN', 'GRAVITE'],
+    'time x severity': ['MS_ACCDN', 'JR_SEMN_ACCDN', 'HR_ACCDN', 'GRAVITE'],
+    'hours x severity': ['HR_ACCDN', 'GRAVITE'],
+    'road x severity': ['CD_CONFG_ROUTE', 'GRAVITE'],
+    'lighting x surface': ['CD_ECLRM', 'CD_ETAT_SURFC']
+}
+SIZES = [None, 10_000_000]
+REPEATS = 5
+
+
+def median_ms(run):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def as_csv_columns(df, columns):
+    '''
+    Returns:
+        pd.DataFrame: `columns` of `df` with the dtypes of pd.read_csv
+    '''
+    frame = {}
+    for column in columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            frame[column] = values.astype(object)
+        else:
+            frame[column] = values.astype('float64')
+    return pd.DataFrame(frame)
+
+
+def main():
+    columns = list(dict.fromkeys(column for by in QUERIES.values() for column in by))
+    data = as_csv_columns(load_dataset(), columns)
+    for size in SIZES:
+        df = data if size is None else data.take(np.resize(np.arange(len(data)), size)).reset_index(drop=True)
+        codes = {column: encode(df[column]) for column in columns}
+        print(f'{len(df):,} rows')
+        print(f'{"query":>18} | {"groupby":>9} {"kernel":>9} {"codes":>8}')
+        for name, by in QUERIES.items():
+            grouped = df.groupby(by).size()
+            levels, counts = dense_counts(df, by)
+            assert grouped.sum() == counts.sum() and len(grouped) == np.count_nonzero(counts)
+            groupby = median_ms(lambda: df.groupby(by).size())
+            kernel = median_ms(lambda: dense_counts(df, by))
+            shape = [len(codes[column][0]) for column in by]
+            coded = median_ms(lambda: count_codes([codes[column][1] for column in by], shape))
+            print(f'{name:>18} | {groupby:>7.1f}ms {kernel:>7.1f}ms {coded:>6.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+'''
+    Figure payload of the dashboard map: one marker per accident
+    ("before") against one bubble per region and severity ("after"),
+    for the year with the most accidents and for all years (the
+    Before / After COVID-19 view).
+
+    Reports the size of the figure JSON sent to the browser and the
+    server time to build and serialize it. The maps are drawn on the
+    shared table, with the weather and surface codes as hover text.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_map
+'''
+import time
+
+import plotly.express as px
+
+from benchmarks.bench_payload import payload_size
+from benchmarks.rows import filter_rows
+from pages.utils.cube import load_cube
+from pages.utils.dataset import load_dataset, load_partitions
+from pages.utils.region_map import bubble_map, region_bubbles
+from pages.utils.regions import lookup
+
+DETAILS = {'CD_COND_METEO': 'Main Weather', 'CD_ETAT_SURFC': 'Main Surface'}
+REPEATS = 3
+
+
+def markers_of_rows(df, filters):
+    rows = filter_rows(df, filters)
+    # The dashboard hovers labels, not the nullable codes
+    rows = rows.assign(lat=lookup(rows['REG_ADM'], 'lat'), lon=lookup(rows['REG_ADM'], 'lon'),
+                       **{column: rows[column].astype(str) for column in DETAILS})
+    return px.scatter_mapbox(rows.dropna(subset=['lat', 'lon']), lat='lat', lon='lon', hover_name='REG_ADM',
+                             hover_data=['GRAVITE', 'CD_COND_METEO', 'CD_ETAT_SURFC'], color='GRAVITE')
+
+
+def bubbles_of_counts(df, filters):
+    bubbles = region_bubbles(load_cube(), filters, details=DETAILS).dropna(subset=['lat', 'lon'])
+    return bubble_map(bubbles, details=DETAILS)
+
+
+def measure(build, df, filters):
+    '''
+    Returns:
+        tuple: Payload in bytes and median time to build and serialize
+        the figure, in ms
+    '''
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        size = payload_size(build(df, filters))
+        timings.append((time.perf_counter() - start) * 1000)
+    return size, sorted(timings)[len(timings) // 2]
+
+
+def main():
+    df = load_dataset()
+    partitions = load_partitions()
+    # The year with the most accidents
+    year = max(partitions, key=lambda year: partitions[year].stop - partitions[year].start)
+    print(f'{"view":>10} {"accidents":>10} | {"before":>10} {"time":>8} | {"after":>8} {"time":>6}')
+    for view, filters in ((str(year), {'AN': year}), ('all years', {})):
+        before = measure(markers_of_rows, df, filters)
+        after = measure(bubbles_of_counts, df, filters)
+        print(f'{view:>10} {len(filter_rows(df, filters)):>10,} | {before[0] / 1024:>7.0f} KB {before[1]:>6.0f}ms | '
+              f'{after[0] / 1024:>5.1f} KB {after[1]:>4.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+'''
+    Peak memory and time of one rerun of each chart of the accident
+    visualizations page: its builder (pages/utils/accident_charts.py,
+    "after") against the row work the builders used to redo on every
+    rerun ("before"): a copy of the table, then the flag, month and
+    Day/Night conversions of the copy and a groupby.
+
+    The road-user flags are now packed into the USER_TYPES bitfield, so
+    the user type "before" runs on flag columns unpacked from it.
+    "before" only replays the row work, so it leaves the figure out;
+    "after" is the whole builder. Memory is traced with tracemalloc,
+    which sees the numpy buffers of pandas too, and times are medians of
+    untraced runs. The state is that of a rerun: the data and the cube
+    are loaded, and each chart was built once (its cuboid exists). The
+    size of the figure JSON, the aggregated output sent to the browser,
+    is given for comparison.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_memory
+'''
+import time
+import tracemalloc
+
+import pandas as pd
+
+from pages.utils.accident_charts import (accident_severity_month_chart, accidents_by_user_type_chart,
+                                         generate_accident_severity_bar_chart_by_time,
+                                         generate_severe_accidents_heatmap_chart)
+from pages.utils.cube import Cube
+from pages.utils.dataset import FLAG_LEVELS, USER_TYPE_FLAGS, derive, load_dataset
+
+REPEATS = 3
+
+
+def with_flags(df):
+    '''
+    Returns:
+        pd.DataFrame: A view of `df` with the road-user flags, unpacked
+        from USER_TYPES, as the table held them before
+    '''
+    bits = df['USER_TYPES'].to_numpy()
+    return derive(df, {name: pd.Categorical.from_codes((bits >> bit & 1).astype('int8'), categories=FLAG_LEVELS)
+                       for bit, name in enumerate(USER_TYPE_FLAGS)})
+
+
+def _period(hours):
+    # Day from 6 AM to 7:59 PM, from the start of the hour range
+    if pd.isna(hours):
+        return 'Unknown'
+    return 'Day' if 6 <= int(hours.split(':')[0]) < 20 else 'Night'
+
+
+def user_type_before(df):
+    df_copy = df.copy()
+    for column in USER_TYPE_FLAGS:
+        df_copy[column] = (df_copy[column] == 'O').astype(int)
+    return df_copy[df_copy['DAY_NIGHT'] == 'Day'][USER_TYPE_FLAGS].sum()
+
+
+def severity_month_before(df):
+    df_clean = df.copy()
+    df_clean['MS_ACCDN'] = pd.to_numeric(df_clean['MS_ACCDN'], errors='coerce').astype('Int64')
+    df_clean['DAY_NIGHT'] = df_clean['HR_ACCDN'].astype(object).apply(_period)
+    df_clean = df_clean.dropna(subset=['GRAVITE', 'MS_ACCDN', 'DAY_NIGHT'])
+    return df_clean[df_clean['DAY_NIGHT'] == 'Day'].groupby(['MS_ACCDN', 'GRAVITE'], observed=True).size()
+
+
+def heatmap_before(df):
+    df_grave = df[df['GRAVITE'] == 'Mortel ou grave'].dropna(subset=['REG_ADM', 'MS_ACCDN']).copy()
+    df_grave['MS_ACCDN'] = pd.to_numeric(df_grave['MS_ACCDN'], errors='coerce').astype('Int64')
+    return df_grave.pivot_table(index='REG_ADM', columns='MS_ACCDN', aggfunc='size', observed=True)
+
+
+def severity_by_time_before(df):
+    df_clean = df.copy().dropna(subset=['GRAVITE', 'MS_ACCDN', 'JR_SEMN_ACCDN', 'HR_ACCDN'])
+    return df_clean.groupby(['MS_ACCDN', 'GRAVITE'], observed=True).size()
+
+
+def measure(run):
+    '''
+    Returns:
+        tuple: Peak memory allocated by `run()`, in bytes, its median
+        time in ms, and its result
+    '''
+    tracemalloc.start()
+    result = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return peak, sorted(timings)[len(timings) // 2], result
+
+
+def main():
+    df = load_dataset()
+    cube = Cube(df)
+    flagged = with_flags(df)
+    charts = {
+        'user type': (lambda: user_type_before(flagged), lambda: accidents_by_user_type_chart(df, 'Day')),
+        'severity by month': (lambda: severity_month_before(df), lambda: accident_severity_month_chart(cube, 'Day')),
+        'severe heatmap': (lambda: heatmap_before(df), lambda: generate_severe_accidents_heatmap_chart(cube)),
+        'severity by time': (lambda: severity_by_time_before(df),
+                             lambda: generate_accident_severity_bar_chart_by_time(cube, 'Month'))
+    }
+    print(f'{len(df):,} rows, {df.memory_usage(deep=True).sum() / 2**20:.0f} MB')
+    print(f'{"chart":>17} | {"before":>9} {"time":>7} | {"after":>9} {"time":>7} | {"output":>8}')
+    for chart, (before, after) in charts.items():
+        after()
+        before_peak, before_time, _ = measure(before)
+        after_peak, after_time, figure = measure(after)
+        print(f'{chart:>17} | {before_peak / 2**20:>6.1f} MB {before_time:>5.0f}ms | '
+              f'{after_peak / 2**10:>6.0f} KB {after_time:>5.0f}ms | {len(figure.to_json()) / 2**10:>5.1f} KB')
+
+
+if __name__ == '__main__':
+    main()
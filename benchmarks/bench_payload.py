@@ -0,0 +1,79 @@
+'''
+    Figure payload of the dashboard bar charts: histograms of the
+    accident rows ("before") against bars of pre-aggregated counts
+    ("after"), for one year of data.
+
+    Reports, per chart, the size of the figure JSON sent to the browser
+    and the server time to build and serialize it. The charts are drawn
+    on the coded columns of the shared table; the dashboard labels them,
+    which makes the row payload larger still.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_payload
+'''
+import time
+
+import plotly.express as px
+
+from benchmarks.rows import count_by, filter_rows
+from pages.utils.dataset import load_dataset, load_partitions
+from pages.utils.severity_chart import severity_bar_chart
+
+CHARTS = {
+    'Weather': 'CD_COND_METEO',
+    'Road Surface': 'CD_ETAT_SURFC',
+    'Lighting': 'CD_ECLRM',
+    'Environment': 'CD_ENVRN_ACCDN',
+    'Road Defects': 'CD_ASPCT_ROUTE',
+    'Construction Zones': 'CD_ZON_TRAVX_ROUTR'
+}
+REPEATS = 3
+
+
+def payload_size(fig):
+    '''
+    Returns:
+        int: Size in bytes of the JSON sent to the browser for `fig`
+    '''
+    return len(fig.to_json().encode())
+
+
+def histogram_of_rows(df, x, filters):
+    return px.histogram(filter_rows(df, filters), x=x, color='GRAVITE', barmode='group')
+
+
+def bars_of_counts(df, x, filters):
+    return severity_bar_chart(count_by(df, [x, 'GRAVITE'], filters), x, barmode='group')
+
+
+def measure(build, df, x, filters):
+    '''
+    Returns:
+        tuple: Payload in bytes and median time to build and serialize
+        the figure, in ms
+    '''
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        size = payload_size(build(df, x, filters))
+        timings.append((time.perf_counter() - start) * 1000)
+    return size, sorted(timings)[len(timings) // 2]
+
+
+def main():
+    df = load_dataset()
+    partitions = load_partitions()
+    # The year with the most accidents
+    year = max(partitions, key=lambda year: partitions[year].stop - partitions[year].start)
+    filters = {'AN': year}
+    print(f'Year {year}, {len(filter_rows(df, filters)):,} accidents')
+    print(f'{"chart":>18} | {"before":>10} {"time":>8} | {"after":>8} {"time":>7}')
+    for chart, x in CHARTS.items():
+        before = measure(histogram_of_rows, df, x, filters)
+        after = measure(bars_of_counts, df, x, filters)
+        print(f'{chart:>18} | {before[0] / 1024:>7.0f} KB {before[1]:>6.0f}ms | '
+              f'{after[0] / 1024:>5.1f} KB {after[1]:>5.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
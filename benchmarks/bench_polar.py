@@ -0,0 +1,61 @@
+'''
+    Counts behind one polar chart (pages/utils/polar_chart.py) when the
+    season changes: the row filter and groupby of the original page,
+    the two cube tables the chart then read per season, and the slice
+    of the shared season x severity x lighting x surface table it reads
+    now. Also reports the time to build that table, once per data
+    version, and the median time of each whole figure.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_polar
+'''
+import time
+
+from pages.utils.cube import Cube
+from pages.utils.dataset import SEASON_LEVELS, load_dataset
+from pages.utils.labels import SURFACE_STATE_CODES
+from pages.utils.polar_chart import ALL_SEASONS, LIGHTING_CODES, SEVERITY_CHOICES, PolarCounts, polar_chart
+
+REPEATS = 20
+
+
+def median_ms(run, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def rows_before(df, season):
+    df_filtered = df[(df['SEASON'] == season) & (df['GRAVITE'] == 'Mortel ou grave')].copy()
+    return df_filtered.groupby(['CD_ECLRM', 'CD_ETAT_SURFC']).size()
+
+
+def cube_before(cube, season):
+    filters = {'SEASON': season, 'SEVERE_FLAG': 'O'}
+    cube.table(['CD_ECLRM', 'CD_ETAT_SURFC'], filters, axes={'CD_ECLRM': LIGHTING_CODES})
+    cube.table(['CD_ECLRM', 'CD_ETAT_SURFC'], filters,
+               axes={'CD_ECLRM': LIGHTING_CODES, 'CD_ETAT_SURFC': SURFACE_STATE_CODES})
+
+
+def main():
+    df = load_dataset()
+    cube = Cube(df)
+    start = time.perf_counter()
+    polar = PolarCounts(cube)
+    print(f'{len(df):,} rows, table of {polar.counts.shape} counts built in '
+          f'{(time.perf_counter() - start) * 1000:.1f}ms')
+    rows = median_ms(lambda: [rows_before(df, season) for season in SEASON_LEVELS], repeats=3) / len(SEASON_LEVELS)
+    cubes = median_ms(lambda: [cube_before(cube, season) for season in SEASON_LEVELS]) / len(SEASON_LEVELS)
+    sliced = median_ms(lambda: [polar.table(season, 'Severe') for season in SEASON_LEVELS]) / len(SEASON_LEVELS)
+    print(f'Counts per season: rows {rows:.1f}ms, cube tables {cubes:.2f}ms, slice {sliced * 1000:.1f}us')
+    print(f'{"season":>12} | ' + ' '.join(f'{severity:>15}' for severity in SEVERITY_CHOICES))
+    for season in SEASON_LEVELS + [ALL_SEASONS]:
+        print(f'{season:>12} | ' + ' '.join(f'{median_ms(lambda: polar_chart(polar, season, severity), 5):>13.1f}ms'
+                                            for severity in SEVERITY_CHOICES))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+'''
+    Per-rerun latency of the dashboard data path with 1, 10 and 50
+    concurrent sessions.
+
+    "before" replays what a cache hit of the former @st.cache_data
+    loader cost, unpickling the whole table it returned (the CSV as
+    parsed by a plain `pd.read_csv`, object columns included), followed
+    by the copying filter chain; "after" filters the shared read-only
+    table directly. Sessions are threads, as Streamlit serves them from
+    one process.
+
+    Each "before" case runs in a forked process, whose peak memory is
+    reported: every concurrent session holds its own unpickled table,
+    and the 50 session case may not fit in memory. The process is then
+    killed, which is reported instead of its latency.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_rerun
+'''
+import multiprocessing
+import pickle
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from pages.utils.dataset import DATA_PATH, clean_columns, load_dataset
+
+SESSIONS = [1, 10, 50]
+RERUNS_PER_SESSION = 3
+
+
+def filter_and_count(df, copy):
+    '''
+    The work of one dashboard rerun: year and severity filters, then
+    the (category, severity) counts behind the main chart.
+    '''
+    dff = df[df['AN'] == 2019]
+    if copy:
+        dff = dff.copy()
+    dff = dff[dff['GRAVITE'] == 'Léger']
+    dff = dff[dff['CD_COND_METEO'] == 11]
+    return dff.groupby(['CD_ETAT_SURFC', 'GRAVITE'], observed=True).size()
+
+
+def rerun_before(blob):
+    return filter_and_count(pickle.loads(blob), copy=True)
+
+
+def rerun_after(df):
+    return filter_and_count(df, copy=False)
+
+
+def measure(rerun, arg, sessions):
+    '''
+    Runs `RERUNS_PER_SESSION` reruns for each of `sessions` concurrent
+    sessions.
+
+    Returns:
+        tuple: Mean and 95th percentile latency of one rerun, in ms
+    '''
+    def timed(_):
+        start = time.perf_counter()
+        rerun(arg)
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        latencies = list(pool.map(timed, range(sessions * RERUNS_PER_SESSION)))
+    return np.mean(latencies), np.percentile(latencies, 95)
+
+
+def isolated(rerun, arg, sessions):
+    '''
+    Runs `measure` in a forked process.
+
+    Returns:
+        tuple: Its result, None if the process died (e.g. out of
+        memory), and the peak memory of the processes run so far, in MB
+    '''
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=lambda: sender.send(measure(rerun, arg, sessions)))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = None
+    process.join()
+    # Kilobytes on Linux
+    return result, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+
+def main():
+    df = load_dataset()
+    # The table the former loader cached, pickled as st.cache_data stores it
+    blob = pickle.dumps(clean_columns(pd.read_csv(DATA_PATH, low_memory=False)))
+    print(f'{len(df):,} rows, cached table {len(blob) / 2**20:.0f} MB pickled, '
+          f'shared table {df.memory_usage(deep=True).sum() / 2**20:.0f} MB')
+    print(f'{"sessions":>8} | {"before mean":>11} {"p95":>8} {"peak":>8} | {"after mean":>10} {"p95":>8}')
+    for sessions in SESSIONS:
+        before, peak = isolated(rerun_before, blob, sessions)
+        before = f'{before[0]:>9.1f}ms {before[1]:>6.1f}ms' if before else f'{"killed (out of memory)":>20}'
+        after = measure(rerun_after, df, sessions)
+        print(f'{sessions:>8} | {before} {peak:>6.0f}MB | {after[0]:>8.1f}ms {after[1]:>6.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+'''
+    Sankey link construction (pages/utils/sankey_chart.py): the loop
+    over the flows the charts used to run (`iterrows` over the cube
+    counts, one link per row) against `sankey_links` on the dense
+    counts, for the two-stage charts and the four-stage one (road
+    category, configuration, surface, severity).
+
+    Also reports the time of the four-stage counts, on a cube without
+    its table (one pass over the rows) and with it, and of the whole
+    chart, figure included. Times are medians.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_sankey
+'''
+import time
+
+from pages.utils.cube import Cube
+from pages.utils.dataset import load_dataset
+from pages.utils.labels import SEVERITY_LABELS
+from pages.utils.sankey_chart import CHART_STAGES, create_sankey_chart, sankey_links
+
+REPEATS = 20
+
+
+def median_ms(run, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def row_links(flows, road_column):
+    # One link per (road level, severity) row of the counts, as the charts did
+    labels = sorted(flows[road_column].unique().tolist()) + sorted(flows['GRAVITE'].unique().tolist())
+    index = {label: i for i, label in enumerate(labels)}
+    source, target, value = [], [], []
+    for _, row in flows.iterrows():
+        source.append(index[row[road_column]])
+        target.append(index[row['GRAVITE']])
+        value.append(row['count'])
+    return source, target, value
+
+
+def main():
+    df = load_dataset()
+    cube = Cube(df)
+    print(f'{len(df):,} rows')
+    print(f'{"chart":>36} | {"stages":>6} {"links":>5} | {"iterrows":>8} {"vectorized":>10} | {"chart":>7}')
+    for chart_type, stages in CHART_STAGES.items():
+        columns = stages + ['GRAVITE']
+        _, counts = cube.table(columns, labels={'GRAVITE': SEVERITY_LABELS})
+        _, source, _, _ = sankey_links(counts)
+        vectorized = median_ms(lambda: sankey_links(counts))
+        if len(stages) == 1:
+            flows = cube.count(columns, labels={'GRAVITE': SEVERITY_LABELS})
+            flows[stages[0]] = flows[stages[0]].astype(str)
+            loop = f'{median_ms(lambda: row_links(flows, stages[0])):>6.2f}ms'
+        else:
+            loop = f'{"-":>8}'
+        chart = median_ms(lambda: create_sankey_chart(cube, chart_type))
+        print(f'{chart_type:>36} | {len(columns):>6} {len(source):>5} | {loop} {vectorized:>8.2f}ms | {chart:>5.1f}ms')
+
+    columns = CHART_STAGES['Category → Configuration → Surface'] + ['GRAVITE']
+    fresh = Cube(df, dimensions=columns)
+    start = time.perf_counter()
+    fresh.table(columns)
+    cold = (time.perf_counter() - start) * 1000
+    print(f'Four-stage counts: {cold:.1f}ms without the table, {median_ms(lambda: fresh.table(columns)):.2f}ms with it')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+'''
+    User type counts from the USER_TYPES bitfield against the five
+    road-user flags it replaces, on the accident data replicated up to
+    about 10M rows.
+
+    "flags" is the count the user type chart did before the flags were
+    packed: per flag, the accidents of the period whose flag is 'O',
+    over five categorical columns (unpacked from USER_TYPES here). The
+    pairs of user types cost ten more such passes. "bitfield" counts
+    the combinations of user types of the period with bincounts over
+    one byte per accident (pages/utils/user_types.py), then reads both
+    the user types and their pairs from the 32 counts. Reports the
+    bytes per accident of the columns, and the median time and peak
+    memory (tracemalloc) of each.
+
+    Usage (from the repository root):
+        python -m benchmarks.bench_user_types
+'''
+import itertools
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from pages.utils.dataset import FLAG_LEVELS, USER_TYPE_FLAGS, load_dataset
+from pages.utils.user_types import combination_counts, pair_counts, type_counts
+
+SCALES = [1, 4, 18]
+REPEATS = 5
+PERIOD = 'Day'
+
+
+def unpack(df):
+    '''
+    Returns:
+        pd.DataFrame: DAY_NIGHT and the road-user flags, unpacked from
+        USER_TYPES as categoricals
+    '''
+    bits = df['USER_TYPES'].to_numpy()
+    flags = {name: pd.Categorical.from_codes((bits >> bit & 1).astype('int8'), categories=FLAG_LEVELS)
+             for bit, name in enumerate(USER_TYPE_FLAGS)}
+    return pd.DataFrame({'DAY_NIGHT': df['DAY_NIGHT'], **flags})
+
+
+def flag_counts(df):
+    period_rows = df['DAY_NIGHT'].array == PERIOD
+    involved = {name: df[name].array == 'O' for name in USER_TYPE_FLAGS}
+    types = [np.count_nonzero(involved[name] & period_rows) for name in USER_TYPE_FLAGS]
+    pairs = [np.count_nonzero(involved[first] & involved[second] & period_rows)
+             for first, second in itertools.combinations(USER_TYPE_FLAGS, 2)]
+    return types, pairs
+
+
+def bitfield_counts(df):
+    counts = combination_counts(df, by='DAY_NIGHT')[list(df['DAY_NIGHT'].cat.categories).index(PERIOD)]
+    matrix = pair_counts(counts)
+    return type_counts(counts).tolist(), [matrix[i, j] for i, j in itertools.combinations(range(len(USER_TYPE_FLAGS)), 2)]
+
+
+def measure(run, df):
+    '''
+    Returns:
+        tuple: Median time of `run(df)` in ms, its peak memory in bytes,
+        and its result
+    '''
+    result = run(df)
+    tracemalloc.start()
+    run(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run(df)
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)[len(timings) // 2], peak, result
+
+
+def main():
+    base = load_dataset()[['DAY_NIGHT', 'USER_TYPES']]
+    print(f'{"rows":>12} | {"flags":>7} {"peak":>9} {"bytes":>5} | {"bitfield":>8} {"peak":>9} {"bytes":>5}')
+    for scale in SCALES:
+        packed = pd.concat([base] * scale, ignore_index=True)
+        flags = unpack(packed)
+        flags_time, flags_peak, expected = measure(flag_counts, flags)
+        bits_time, bits_peak, result = measure(bitfield_counts, packed)
+        assert result == expected
+        flag_bytes = sum(flags[name].memory_usage(deep=True) for name in USER_TYPE_FLAGS) / len(flags)
+        print(f'{len(packed):>12,} | {flags_time:>5.0f}ms {flags_peak / 2**20:>6.1f} MB {flag_bytes:>5.0f} | '
+              f'{bits_time:>6.0f}ms {bits_peak / 2**20:>6.1f} MB {packed["USER_TYPES"].to_numpy().itemsize:>5}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+'''
+    Filtered counts over the accident rows, the baseline the benchmarks
+    compare the app with: the charts read their counts from the cube
+    (pages/utils/cube.py) and no longer scan rows.
+
+    `count_by` answers "how many accidents per value of these columns
+    among the rows matching these filters", with boolean masks over the
+    shared frame and a groupby; `dense_counts` answers it without the
+    filters, with the bincount kernel of pages/utils/aggregate.py.
+'''
+import numpy as np
+
+from pages.utils.aggregate import count_codes, encode
+
+
+def filter_mask(df, filters):
+    '''
+    Computes the rows of `df` matching every filter.
+
+    Args:
+        df (pd.DataFrame): The data to filter
+        filters (dict): Column to required value, None meaning no filter
+    Returns:
+        np.ndarray: Boolean mask over the rows of `df`
+    '''
+    mask = np.ones(len(df), dtype=bool)
+    for column, value in filters.items():
+        if value is not None:
+            mask &= (df[column] == value).to_numpy(dtype=bool, na_value=False)
+    return mask
+
+
+def filter_rows(df, filters):
+    '''
+    Returns the rows of `df` matching every filter, selected in one step.
+    '''
+    if all(value is None for value in filters.values()):
+        return df
+    return df[filter_mask(df, filters)]
+
+
+def count_by(df, by, filters=None):
+    '''
+    Counts the accidents matching `filters` for each combination of the
+    `by` columns. Rows with a missing key are left out.
+
+    Args:
+        df (pd.DataFrame): The data to count
+        by (list): Columns to group by
+        filters (dict): Column to required value, None meaning no filter
+    Returns:
+        pd.DataFrame: The `by` columns and a 'count' column, sorted by key
+    '''
+    selected = df.loc[filter_mask(df, filters or {}), list(by)]
+    return selected.groupby(list(by), observed=True).size().reset_index(name='count')
+
+
+def dense_counts(df, by, levels=None):
+    '''
+    Counts the rows of `df` per combination of the `by` columns.
+
+    Args:
+        df (pd.DataFrame): The rows to count
+        by (list): Key columns
+        levels (dict): Column to the values of its axis, see `encode`
+    Returns:
+        tuple: The levels of each key (a list of pd.Index) and the
+        counts, an array with one axis per key. Rows with a missing key,
+        or a value outside of its levels, are left out
+    '''
+    levels = levels or {}
+    encoded = [encode(df[column], levels.get(column)) for column in by]
+    return ([axis for axis, _ in encoded],
+            count_codes([codes for _, codes in encoded], [len(axis) for axis, _ in encoded]))
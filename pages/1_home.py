@@ -11,22 +11,23 @@ Original file is located at
 
 # pages/01_Home.py
 import streamlit as st
-import pandas as pd
 
-# It's good practice to cache data loading for performance in Streamlit apps,
-# especially if the data doesn't change frequently.
-@st.cache_data
-def load_data():
+from pages.utils.dataset import load_dataset, data_version, derive
+
+# The CSV is parsed once per process by the shared loader; the page only
+# caches its own derived columns on top of it.
+@st.cache_resource(max_entries=1)
+def load_data(version):
     """
     Loads and preprocesses the accident data.
-    Using st.cache_data ensures the data is loaded only once,
-    improving app performance.
+    The returned view shares its columns with the other pages and
+    must not be modified in place. It is rebuilt when the data `version` changes.
     """
     try:
-        df = pd.read_csv('assets/data_fusionnee.csv')
-        df['MS_ACCDN'] = df['MS_ACCDN'].astype(int)
-        df['Gravité'] = df['GRAVITE'].apply(lambda x: 'Grave' if x == 'Mortel ou grave' else 'Autre')
-        return df
+        df = load_dataset(version)
+        return derive(df, {
+            'Gravité': df['SEVERE_FLAG'].cat.rename_categories({'N': 'Autre', 'O': 'Grave'})
+        })
     except FileNotFoundError:
         st.error("Error: 'assets/data_fusionnee.csv' not found. Please ensure the file is in the 'assets' directory.")
         st.stop() # Stop the app execution if data isn't found
@@ -34,7 +35,7 @@ def load_data():
         st.error(f"An error occurred while loading data: {e}")
         st.stop()
 
-df = load_data()
+df = load_data(data_version())
 
 def get_kpis(data):
     """
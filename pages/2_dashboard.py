@@ -11,72 +11,61 @@ Original file is located at
 
 # pages/02_Dashboard.py
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objs as go
 
+from pages.utils.bitmaps import BitmapIndex
+from pages.utils.cube import load_cube
+from pages.utils.dataset import load_dataset, load_partitions, data_version, derive, decode
+from pages.utils.facets import Facets
+from pages.utils.figure_cache import cached_figure
+from pages.utils.labels import SEVERITY_SHORT_LABELS
+from pages.utils.region_map import bubble_map, region_bubbles
+from pages.utils.severity_chart import severity_bar_chart
+from pages.utils.trends import COVID_START, RESOLUTIONS, covid_summary, load_trends
+
+# --- Labels ---
+
+weather_mapping = {11: 'Clear', 12: 'Overcast', 13: 'Fog/Mist', 14: 'Rain/Drizzle', 15: 'Heavy Rain',
+                   16: 'Strong Wind', 17: 'Snow/Hail', 18: 'Blowing Snow/Storm',
+                   19: 'Freezing Rain', 99: 'Other'}
+surface_mapping = {11: 'Dry', 12: 'Wet', 13: 'Aquaplaning', 14: 'Sand/Gravel', 15: 'Slush/Snow',
+                   16: 'Snow-covered', 17: 'Hard-packed Snow', 18: 'Icy', 19: 'Muddy', 20: 'Oily', 99: 'Other'}
+lighting_mapping = {1: 'Daylight - Clear Visibility', 2: 'Daylight - Low Visibility',
+                    3: 'Night - Road Illuminated', 4: 'Night - Not Illuminated'}
+env_mapping = {1: 'School Zone', 2: 'Residential', 3: 'Business / Commercial', 4: 'Industrial',
+               5: 'Rural', 6: 'Forestry', 7: 'Recreational', 9: 'Other', 0: 'Not Specified'}
+
+# Labels of the cube dimensions shown by the dashboard: the charts and the map
+# are drawn from the cube of accident counts (see pages/utils/cube.py), and the
+# filters hold labels
+dimension_labels = {
+    'GRAVITE': SEVERITY_SHORT_LABELS,
+    'CD_COND_METEO': weather_mapping,
+    'CD_ETAT_SURFC': surface_mapping,
+    'CD_ECLRM': lighting_mapping,
+    'CD_ENVRN_ACCDN': env_mapping
+}
+
 # --- Data Loading and Preprocessing (Cached for Performance) ---
 
-@st.cache_data
-def load_data():
+@st.cache_resource(max_entries=1)
+def load_data(version):
     """
-    Loads and preprocesses the accident data for the dashboard.
-    This function is cached to prevent re-loading data on every rerun.
+    Builds the dashboard view of the shared accident data, whose filterable
+    columns give the filter options (see `load_facets`).
+    This function is cached to prevent re-deriving columns on every rerun;
+    the returned frame is shared by all sessions and must not be modified.
+    It is rebuilt once per data `version` (see `data_version`).
     """
     try:
-        df = pd.read_csv('assets/data_fusionnee.csv')
-        df.columns = df.columns.str.strip().str.replace('"', '')
-        df = df.rename(columns=lambda x: x.strip())
-
-        # Prepare 'GRAVITE' column
-        df['GRAVITE'] = df['GRAVITE'].replace({
-            'Dommages matériels seulement': 'Matériels',
-            'Dommages matériels inférieurs au seuil de rapportage': 'Mineurs',
-            'Léger': 'Léger',
-            'Mortel ou grave': 'Grave'
+        df = load_dataset(version)
+        return derive(df, {
+            'GRAVITE': df['GRAVITE'].cat.rename_categories(SEVERITY_SHORT_LABELS),
+            'CD_COND_METEO': decode(df['CD_COND_METEO'], weather_mapping),
+            'CD_ETAT_SURFC': decode(df['CD_ETAT_SURFC'], surface_mapping),
+            'Environment_Label': decode(df['CD_ENVRN_ACCDN'], env_mapping)
         })
-
-        # Mappings
-        weather_mapping = {11: 'Clear', 12: 'Overcast', 13: 'Fog/Mist', 14: 'Rain/Drizzle', 15: 'Heavy Rain',
-                           16: 'Strong Wind', 17: 'Snow/Hail', 18: 'Blowing Snow/Storm',
-                           19: 'Freezing Rain', 99: 'Other'}
-        surface_mapping = {11: 'Dry', 12: 'Wet', 13: 'Aquaplaning', 14: 'Sand/Gravel', 15: 'Slush/Snow',
-                           16: 'Snow-covered', 17: 'Hard-packed Snow', 18: 'Icy', 19: 'Muddy', 20: 'Oily', 99: 'Other'}
-        lighting_mapping = {1: 'Daylight - Clear Visibility', 2: 'Daylight - Low Visibility',
-                            3: 'Night - Road Illuminated', 4: 'Night - Not Illuminated'}
-        env_mapping = {1: 'School Zone', 2: 'Residential', 3: 'Business / Commercial', 4: 'Industrial',
-                       5: 'Rural', 6: 'Forestry', 7: 'Recreational', 9: 'Other', 0: 'Not Specified'}
-
-        df['CD_COND_METEO'] = df['CD_COND_METEO'].map(weather_mapping)
-        df['CD_ETAT_SURFC'] = df['CD_ETAT_SURFC'].map(surface_mapping)
-        df['Lighting_Label'] = df['CD_ECLRM'].map(lighting_mapping)
-        df['Environment_Label'] = df['CD_ENVRN_ACCDN'].map(env_mapping)
-
-        # Region coordinates for map
-        region_coords = {
-            'Bas-Saint-Laurent (01)': (48.5, -68.5),
-            'Saguenay/-Lac-Saint-Jean (02)': (48.4, -71.1),
-            'Capitale-Nationale (03)': (47.0, -71.2),
-            'Mauricie (04)': (46.5, -72.7),
-            'Estrie (05)': (45.4, -71.9),
-            'Montréal (06)': (45.5, -73.6),
-            'Outaouais (07)': (45.6, -76.0),
-            'Abitibi-Témiscamingue (08)': (48.1, -78.0),
-            'Côte-Nord (09)': (50.0, -63.0),
-            'Nord-du-Québec (10)': (52.0, -75.0),
-            'Gaspésie/-Îles-de-la-Madeleine (11)': (49.1, -65.4),
-            'Chaudière-Appalaches (12)': (46.5, -70.5),
-            'Laval (13)': (45.6, -73.8),
-            'Lanaudière (14)': (46.0, -73.4),
-            'Laurentides (15)': (46.5, -74.2),
-            'Montérégie (16)': (45.3, -73.0),
-            'Centre-du-Québec (17)': (46.0, -72.0)
-        }
-        df['Region'] = df['REG_ADM'].str.strip()
-        df['lat'] = df['REG_ADM'].map(lambda x: region_coords.get(x.strip(), (None, None))[0] if pd.notna(x) else None)
-        df['lon'] = df['REG_ADM'].map(lambda x: region_coords.get(x.strip(), (None, None))[1] if pd.notna(x) else None)
-
-        return df
     except FileNotFoundError:
         st.error("Error: 'assets/data_fusionnee.csv' not found. Please ensure the file is in the 'assets' directory.")
         st.stop()
@@ -84,7 +73,25 @@ def load_data():
         st.error(f"An error occurred while loading data: {e}")
         st.stop()
 
-df = load_data()
+# Filterable columns of the dashboard view
+filter_columns = ['AN', 'GRAVITE', 'CD_COND_METEO', 'CD_ETAT_SURFC', 'Environment_Label',
+                  'CD_ASPCT_ROUTE', 'CD_ZON_TRAVX_ROUTR']
+
+@st.cache_resource(max_entries=1)
+def load_facets(version):
+    """
+    Precomputes the filter options with their number of accidents, for every year
+    and severity (see pages/utils/facets.py), from a bitmap index of the filterable
+    columns (see pages/utils/bitmaps.py). They are computed once per data `version`
+    and shared by all sessions.
+    """
+    index = BitmapIndex(load_data(version), filter_columns)
+    return Facets(index, filter_columns, context=['AN', 'GRAVITE'])
+
+# Data version of this run, resolved once so that every loader reads the same one
+version = data_version()
+facets = load_facets(version)
+cube = load_cube(version)
 
 # --- Streamlit Layout ---
 
@@ -125,44 +132,85 @@ disable_construction = (selected_chart != 'Construction Zones')
 # Layout for filter dropdowns using columns
 filter_cols = st.columns(6)
 
+years = list(load_partitions(version)) # Years of the data, in order
+
+# Filters the options depend on. The year slider is drawn below the severity
+# filter, so the severity options use its value (a year, or a range of years)
+# from the last run.
+if st.session_state.get('filter-annee-mode') == 'Year range':
+    facet_filters = {'AN': tuple(st.session_state.get('filter-annees', (years[0], years[-1])))}
+else:
+    facet_filters = {'AN': st.session_state.get('filter-annee', years[0])}
+
+def facet_options(column):
+    """
+    Options of a filter dropdown: 'All' and the values found among the accidents of
+    the selected year and severity, precomputed for every year and severity. Also
+    returns their labels, with the number of accidents of each option.
+    """
+    counts = facets.counts(column, facet_filters)
+    total = facets.total(facet_filters, column)
+    return ['All'] + sorted(counts), lambda value: f"{value} ({total if value == 'All' else counts[value]:,})"
+
 # Gravite (Severity) filter - always available unless 'covid' selected
 with filter_cols[0]:
-    gravite_options = ['All'] + sorted(df['GRAVITE'].dropna().unique().tolist())
+    gravite_options, gravite_labels = facet_options('GRAVITE')
     gravite_filter = st.selectbox(
         "Severity",
         options=gravite_options,
         index=0,
+        format_func=gravite_labels,
         disabled=disable_all_filters,
         key='filter-gravite'
     )
     if gravite_filter == 'All':
         gravite_filter = None # Treat 'All' as no filter
 
-# Year slider (always available)
+# Year slider (always available): one year, or a range of years
 st.markdown("---")
 st.subheader("Year Filter")
-annee_filter = st.slider(
-    "Filter by year",
-    min_value=int(df['AN'].min()),
-    max_value=int(df['AN'].max()),
-    value=int(df['AN'].min()),
-    step=1,
-    format='%d',
-    key='filter-annee'
+year_mode = st.radio(
+    "Compare",
+    options=['Single year', 'Year range'],
+    horizontal=True,
+    key='filter-annee-mode'
 )
+if year_mode == 'Year range':
+    # Counts over a range of years are the difference of two rows of per-year
+    # cumulative counts (see `Cube.span`), whatever the number of years
+    annee_filter = st.slider(
+        "Filter by years",
+        min_value=years[0],
+        max_value=years[-1],
+        value=(years[0], years[-1]),
+        step=1,
+        format='%d',
+        key='filter-annees'
+    )
+    year_label = f"{annee_filter[0]}–{annee_filter[1]}" if annee_filter[0] != annee_filter[1] else annee_filter[0]
+else:
+    annee_filter = st.slider(
+        "Filter by year",
+        min_value=years[0],
+        max_value=years[-1],
+        value=years[0],
+        step=1,
+        format='%d',
+        key='filter-annee'
+    )
+    year_label = annee_filter
 
 # Apply initial year and severity filter to get dynamic dropdown options
-filtered_df_for_options = df[df['AN'] == annee_filter]
-if gravite_filter:
-    filtered_df_for_options = filtered_df_for_options[filtered_df_for_options['GRAVITE'] == gravite_filter]
+facet_filters = {'AN': annee_filter, 'GRAVITE': gravite_filter}
 
 # Dynamic filter options
 with filter_cols[1]:
-    meteo_options = ['All'] + sorted(filtered_df_for_options['CD_COND_METEO'].dropna().unique().tolist())
+    meteo_options, meteo_labels = facet_options('CD_COND_METEO')
     meteo_filter = st.selectbox(
         "Weather",
         options=meteo_options,
         index=0,
+        format_func=meteo_labels,
         disabled=disable_weather_surface,
         key='filter-meteo'
     )
@@ -170,11 +218,12 @@ with filter_cols[1]:
         meteo_filter = None
 
 with filter_cols[2]:
-    surface_options = ['All'] + sorted(filtered_df_for_options['CD_ETAT_SURFC'].dropna().unique().tolist())
+    surface_options, surface_labels = facet_options('CD_ETAT_SURFC')
     surface_filter = st.selectbox(
         "Surface",
         options=surface_options,
         index=0,
+        format_func=surface_labels,
         disabled=disable_weather_surface,
         key='filter-surface'
     )
@@ -182,11 +231,12 @@ with filter_cols[2]:
         surface_filter = None
 
 with filter_cols[3]:
-    env_options = ['All'] + sorted(filtered_df_for_options['Environment_Label'].dropna().unique().tolist())
+    env_options, env_labels = facet_options('Environment_Label')
     env_filter = st.selectbox(
         "Environment",
         options=env_options,
         index=0,
+        format_func=env_labels,
         disabled=disable_environment,
         key='filter-env'
     )
@@ -194,11 +244,12 @@ with filter_cols[3]:
         env_filter = None
 
 with filter_cols[4]:
-    road_options = ['All'] + sorted(filtered_df_for_options['CD_ASPCT_ROUTE'].dropna().unique().tolist())
+    road_options, road_labels = facet_options('CD_ASPCT_ROUTE')
     road_filter = st.selectbox(
         "Road Defect",
         options=road_options,
         index=0,
+        format_func=road_labels,
         disabled=disable_defects,
         key='filter-road'
     )
@@ -206,11 +257,12 @@ with filter_cols[4]:
         road_filter = None
 
 with filter_cols[5]:
-    const_options = ['All'] + sorted(filtered_df_for_options['CD_ZON_TRAVX_ROUTR'].dropna().unique().tolist())
+    const_options, const_labels = facet_options('CD_ZON_TRAVX_ROUTR')
     const_filter = st.selectbox(
         "Construction Zone",
         options=const_options,
         index=0,
+        format_func=const_labels,
         disabled=disable_construction,
         key='filter-const'
     )
@@ -220,165 +272,207 @@ with filter_cols[5]:
 
 # --- Main Graph and Map Generation ---
 
-# Apply all filters for the main data used in graphs
-if selected_chart == 'Before / After COVID-19':
-    dff = df.copy() # Keep all years for COVID analysis
-else:
-    dff = df[df['AN'] == annee_filter].copy()
-
-if gravite_filter:
-    dff = dff[dff['GRAVITE'] == gravite_filter]
-if meteo_filter:
-    dff = dff[dff['CD_COND_METEO'] == meteo_filter]
-if surface_filter:
-    dff = dff[dff['CD_ETAT_SURFC'] == surface_filter]
-if env_filter:
-    dff = dff[dff['Environment_Label'] == env_filter]
-if road_filter:
-    dff = dff[dff['CD_ASPCT_ROUTE'] == road_filter]
-if const_filter:
-    dff = dff[dff['CD_ZON_TRAVX_ROUTR'] == const_filter]
-
-
-# Create main graph based on selection
-main_fig = go.Figure()
-map_fig = go.Figure()
-
-if selected_chart == 'Weather':
-    main_fig = px.histogram(dff, x='CD_COND_METEO', color='GRAVITE',
-                            barmode='group',
-                            title=f"Accidents by Weather Conditions - {annee_filter}",
-                            labels={'CD_COND_METEO': 'Weather Condition', 'count': 'Number of Accidents'})
-
-elif selected_chart == 'Road Surface':
-    main_fig = px.histogram(dff, x='CD_ETAT_SURFC', color='GRAVITE',
-                            barmode='group',
-                            title=f"Accidents by Road Surface - {annee_filter}",
-                            labels={'CD_ETAT_SURFC': 'Road Surface Condition', 'count': 'Number of Accidents'})
-
-elif selected_chart == 'Lighting':
-    main_fig = px.histogram(dff, x='Lighting_Label', color='GRAVITE',
-                            barmode='group',
-                            title=f"Accidents by Lighting Conditions - {annee_filter}",
-                            labels={'Lighting_Label': 'Lighting Condition', 'count': 'Number of Accidents'})
-
-elif selected_chart == 'Environment':
-    main_fig = px.histogram(dff, x='Environment_Label', color='GRAVITE',
-                            title=f"Accidents by Environment - {annee_filter}",
-                            labels={'Environment_Label': 'Environment Type', 'count': 'Number of Accidents'})
-
-elif selected_chart == 'Road Defects':
-    main_fig = px.histogram(dff, x='CD_ASPCT_ROUTE', color='GRAVITE',
-                            barmode='group',
-                            title=f"Accidents by Road Defects - {annee_filter}",
-                            labels={'CD_ASPCT_ROUTE': 'Road Defect Type', 'count': 'Number of Accidents'})
-
-elif selected_chart == 'Construction Zones':
-    main_fig = px.histogram(dff, x='CD_ZON_TRAVX_ROUTR', color='GRAVITE',
-                            barmode='group',
-                            title=f"Accidents in Construction Zones - {annee_filter}",
-                            labels={'CD_ZON_TRAVX_ROUTR': 'Construction Zone Presence', 'count': 'Number of Accidents'})
+# All filters used by the graphs, None meaning no filter, on the dimensions of the cube
+filters = {
+    'AN': None if selected_chart == 'Before / After COVID-19' else annee_filter, # Keep all years for COVID analysis
+    'GRAVITE': gravite_filter,
+    'CD_COND_METEO': meteo_filter,
+    'CD_ETAT_SURFC': surface_filter,
+    'CD_ENVRN_ACCDN': env_filter,
+    'CD_ASPCT_ROUTE': road_filter,
+    'CD_ZON_TRAVX_ROUTR': const_filter
+}
+# The figures are cached per chart and filters, shared by all sessions (see
+# pages/utils/figure_cache.py): the titles only depend on the filters
+filter_key = tuple(filters.items())
+
+def severity_bars(x, **kwargs):
+    """
+    Bar chart of accidents per value of `x` and severity. The counts are read
+    from the cube (see pages/utils/cube.py) and only the resulting bars are
+    sent to the browser.
+    """
+    return cached_figure('dashboard', x, filter_key, lambda: severity_bar_chart(
+        cube.count([x, 'GRAVITE'], filters, dimension_labels), x, **kwargs), version)
 
-elif selected_chart == 'Weather vs Surface Heatmap':
+def weather_surface_heatmap():
+    """Heatmap of the severe accidents per weather and road surface."""
     # Filter for severe accidents only as per original Dash code
-    severe_dff = dff[dff['GRAVITE'] == 'Grave']
-    if not severe_dff.empty:
-        main_fig = px.density_heatmap(
-            severe_dff,
+    counts = cube.count(['CD_COND_METEO', 'CD_ETAT_SURFC', 'GRAVITE'], filters, dimension_labels)
+    severe_counts = counts[counts['GRAVITE'] == 'Grave']
+    if not severe_counts.empty:
+        return px.density_heatmap(
+            severe_counts,
             x='CD_COND_METEO',
             y='CD_ETAT_SURFC',
-            title=f"Severe Accidents: Weather vs Road Surface - {annee_filter}",
+            z='count',
+            histfunc='sum',
+            title=f"Severe Accidents: Weather vs Road Surface - {year_label}",
             labels={'CD_COND_METEO': 'Weather', 'CD_ETAT_SURFC': 'Road Surface'},
             color_continuous_scale='Reds'
         )
-    else:
-        main_fig = go.Figure()
-        main_fig.update_layout(title="No severe accident data for selected filters.", xaxis={"visible": False}, yaxis={"visible": False})
-
-elif selected_chart == 'Before / After COVID-19':
-    # No year filter applied to dff if 'covid' selected
-    covid_data = dff.groupby('AN').agg(
-        Total=('AN', 'size'),
-        Severe=('GRAVITE', lambda x: (x == 'Grave').sum())
-    ).reset_index()
-
-    main_fig = go.Figure()
-    main_fig.add_trace(go.Scatter(
-        x=covid_data['AN'],
+    fig = go.Figure()
+    fig.update_layout(title="No severe accident data for selected filters.", xaxis={"visible": False}, yaxis={"visible": False})
+    return fig
+
+def covid_chart(covid_data, resolution):
+    """Line chart of the total and severe accidents per year or month, with the COVID-19 period shaded."""
+    period = 'Month' if resolution == 'Month' else 'AN'
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=covid_data[period],
         y=covid_data['Total'],
         mode='lines+markers',
         name='Total Accidents',
         line=dict(color='blue', width=2)
     ))
-    main_fig.add_trace(go.Scatter(
-        x=covid_data['AN'],
+    fig.add_trace(go.Scatter(
+        x=covid_data[period],
         y=covid_data['Severe'],
         mode='lines+markers',
         name='Severe Accidents',
         line=dict(color='red', width=2)
     ))
 
-    # Add vertical line for selected year (from slider)
-    main_fig.add_vline(
-        x=annee_filter,
-        line_width=3,
-        line_dash="dash",
-        line_color="green",
-        annotation_text=f"Selected Year: {annee_filter}",
-        annotation_position="top right"
-    )
+    # Add vertical line for selected year, or shade the selected years (from slider)
+    if resolution == 'Month':
+        # Shade the months of the selected years
+        first, last = annee_filter if isinstance(annee_filter, tuple) else (annee_filter, annee_filter)
+        fig.add_vrect(
+            x0=f"{first}-01-01", x1=f"{last}-12-31",
+            fillcolor="green", opacity=0.1,
+            annotation_text=f"Selected: {year_label}",
+            annotation_position="top right"
+        )
+    elif isinstance(annee_filter, tuple):
+        fig.add_vrect(
+            x0=annee_filter[0], x1=annee_filter[1],
+            fillcolor="green", opacity=0.1,
+            annotation_text=f"Selected Years: {year_label}",
+            annotation_position="top right"
+        )
+    else:
+        fig.add_vline(
+            x=annee_filter,
+            line_width=3,
+            line_dash="dash",
+            line_color="green",
+            annotation_text=f"Selected Year: {annee_filter}",
+            annotation_position="top right"
+        )
 
     # COVID period shading
     if not covid_data.empty:
-        main_fig.add_vrect(
-            x0=2020, x1=covid_data['AN'].max(),
+        fig.add_vrect(
+            x0=COVID_START if resolution == 'Month' else COVID_START.year, x1=covid_data[period].max(),
             fillcolor="lightgray", opacity=0.2,
             annotation_text="COVID-19 Period",
             annotation_position="top left"
         )
 
-    main_fig.update_layout(
+    fig.update_layout(
         title="Accident Trends Before/After COVID-19",
-        xaxis_title="Year",
+        xaxis_title="Month" if resolution == 'Month' else "Year",
         yaxis_title="Number of Accidents",
         hovermode="x unified"
     )
+    return fig
+
+def region_map(map_title):
+    """Map of the accidents per region and severity, for the filters."""
+    # One bubble per region and severity, at the region centroid (see pages/utils/region_map.py)
+    map_details = {'CD_COND_METEO': 'Main Weather', 'CD_ETAT_SURFC': 'Main Surface'}
+    map_df = region_bubbles(cube, filters, details=map_details, labels=dimension_labels)
+    map_df = map_df.dropna(subset=['lat', 'lon']) # Drop bubbles without coordinates for map
+
+    if not map_df.empty:
+        fig = bubble_map(
+            map_df,
+            details=map_details,
+            zoom=5,
+            center={"lat": 46.8, "lon": -71.2},  # Center on Quebec City
+            height=500,
+            title=map_title,
+            color_discrete_map={
+                'Grave': 'red',
+                'Léger': 'orange',
+                'Matériels': 'blue',
+                'Mineurs': 'green'
+            },
+            # Smaller severities last, so they are drawn over the larger bubbles
+            category_orders={'GRAVITE': ['Matériels', 'Mineurs', 'Léger', 'Grave']}
+        )
+        fig.update_layout(
+            mapbox_style="open-street-map",
+            margin={"r":0,"t":30,"l":0,"b":0}
+        )
+    else:
+        fig = go.Figure()
+        fig.update_layout(
+            title="No map data to display for selected filters",
+            xaxis={"visible": False},
+            yaxis={"visible": False}
+        )
+    return fig
+
+# Create main graph based on selection
+main_fig = go.Figure()
+
+if selected_chart == 'Weather':
+    main_fig = severity_bars('CD_COND_METEO',
+                             barmode='group',
+                             title=f"Accidents by Weather Conditions - {year_label}",
+                             labels={'CD_COND_METEO': 'Weather Condition'})
+
+elif selected_chart == 'Road Surface':
+    main_fig = severity_bars('CD_ETAT_SURFC',
+                             barmode='group',
+                             title=f"Accidents by Road Surface - {year_label}",
+                             labels={'CD_ETAT_SURFC': 'Road Surface Condition'})
+
+elif selected_chart == 'Lighting':
+    main_fig = severity_bars('CD_ECLRM',
+                             barmode='group',
+                             title=f"Accidents by Lighting Conditions - {year_label}",
+                             labels={'CD_ECLRM': 'Lighting Condition'})
+
+elif selected_chart == 'Environment':
+    main_fig = severity_bars('CD_ENVRN_ACCDN',
+                             title=f"Accidents by Environment - {year_label}",
+                             labels={'CD_ENVRN_ACCDN': 'Environment Type'})
+
+elif selected_chart == 'Road Defects':
+    main_fig = severity_bars('CD_ASPCT_ROUTE',
+                             barmode='group',
+                             title=f"Accidents by Road Defects - {year_label}",
+                             labels={'CD_ASPCT_ROUTE': 'Road Defect Type'})
+
+elif selected_chart == 'Construction Zones':
+    main_fig = severity_bars('CD_ZON_TRAVX_ROUTR',
+                             barmode='group',
+                             title=f"Accidents in Construction Zones - {year_label}",
+                             labels={'CD_ZON_TRAVX_ROUTR': 'Construction Zone Presence'})
+
+elif selected_chart == 'Weather vs Surface Heatmap':
+    main_fig = cached_figure('dashboard', 'weather vs surface', filter_key, weather_surface_heatmap, version)
+
+elif selected_chart == 'Before / After COVID-19':
+    # No year filter applied if 'covid' selected. The series are read from the trend
+    # counts stored with the data (see pages/utils/trends.py), or from the cube when
+    # several filter dimensions are set.
+    resolution = st.radio("Trend resolution", options=RESOLUTIONS, horizontal=True, key='covid-resolution')
+    covid_data = load_trends(version).series(filters, dimension_labels, resolution, cube=cube)
+    covid_summary_data = covid_summary(covid_data)
+    main_fig = cached_figure('dashboard', 'covid', (resolution, annee_filter, filter_key),
+                             lambda: covid_chart(covid_data, resolution), version)
 
 # --- Map Generation ---
-# Create map only if there is data and valid coordinates
-map_df = dff.copy()
-map_df = map_df.dropna(subset=['lat', 'lon']) # Drop rows without coordinates for map
-
-if not map_df.empty:
-    map_fig = px.scatter_mapbox(
-        map_df,
-        lat='lat',
-        lon='lon',
-        hover_name='Region',
-        hover_data=['GRAVITE', 'CD_COND_METEO', 'CD_ETAT_SURFC'],
-        color='GRAVITE',
-        zoom=5,
-        center={"lat": 46.8, "lon": -71.2},  # Center on Quebec City
-        height=500,
-        title=f"Accidents by Region - {annee_filter}" if selected_chart != 'Before / After COVID-19' else "Accidents by Region (All Years)",
-        color_discrete_map={
-            'Grave': 'red',
-            'Léger': 'orange',
-            'Matériels': 'blue',
-            'Mineurs': 'green'
-        }
-    )
-    map_fig.update_layout(
-        mapbox_style="open-street-map",
-        margin={"r":0,"t":30,"l":0,"b":0}
-    )
+if selected_chart == 'Before / After COVID-19':
+    map_title = "Accidents by Region (All Years)"
 else:
-    map_fig = go.Figure()
-    map_fig.update_layout(
-        title="No map data to display for selected filters",
-        xaxis={"visible": False},
-        yaxis={"visible": False}
-    )
+    map_title = f"Accidents by Region - {year_label}"
+map_fig = cached_figure('dashboard', 'region map', (map_title, filter_key), lambda: region_map(map_title),
+                        version)
 
 # --- Display Graphs ---
 st.markdown("---")
@@ -386,6 +480,10 @@ graph_col, map_col = st.columns([2, 1]) # Adjust column ratio as needed
 
 with graph_col:
     st.plotly_chart(main_fig, use_container_width=True)
+    if selected_chart == 'Before / After COVID-19':
+        # Mean accidents per year (or month) before and since the start of the pandemic
+        st.caption(f"Average per {resolution.lower()}, before and since {COVID_START:%B %Y}")
+        st.dataframe(covid_summary_data.style.format('{:,.1f}'), use_container_width=True)
 
 with map_col:
     st.plotly_chart(map_fig, use_container_width=True)
\ No newline at end of file
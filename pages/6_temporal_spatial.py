@@ -12,111 +12,30 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import numpy as np # For numerical operations
 
-# --- Data Loading and Preprocessing (Cached for Performance) ---
+from pages.utils.cube import NOT_MISSING, load_cube
+from pages.utils.dataset import data_version
+from pages.utils.figure_cache import cached_figure
+from pages.utils.labels import SEVERITY_SHORT_LABELS, WEEK_TYPE_LABELS
+from pages.utils.regions import REGIONS, attach
 
-@st.cache_data
-def prep_data():
+# Region names without the numbers in parentheses, from the region dimension table
+REGION_NAMES = dict(zip(REGIONS['label'], REGIONS['name'].str.upper()))
+# Labels applied to the counts of the cube, and the page column of each dimension
+LABELS = {'JR_SEMN_ACCDN': WEEK_TYPE_LABELS, 'GRAVITE': SEVERITY_SHORT_LABELS, 'REG_ADM': REGION_NAMES}
+COLUMNS = {'QUARTER_DAY': 'quarter_day', 'REG_ADM': 'Region'}
+
+# --- Data Loading (Cached for Performance) ---
+
+def prep_data(version):
     """
-    Loads and preprocesses the accident data for temporal-spatial analysis.
-    This function is cached to prevent re-loading data on every rerun.
-    It now relies on existing columns for temporal granularity.
+    Returns the shared cube of accident counts the page is drawn from (see pages/utils/cube.py).
+    It is built once per data version and must not be modified.
+    It now relies on existing columns for temporal granularity ('quarter_day' is
+    precomputed at ingest from the start of 'HR_ACCDN').
     """
     try:
-        df = pd.read_csv('assets/data_fusionnee.csv')
-
-        # Clean column names (remove leading/trailing spaces and quotes)
-        df.columns = df.columns.str.strip().str.replace('"', '')
-        df = df.rename(columns=lambda x: x.strip())
-        # st.info(f"Initial DataFrame columns after cleaning: {df.columns.tolist()}") # Debugging
-
-        # Ensure 'AN' (Year) is integer
-        if 'AN' in df.columns:
-            df['AN'] = df['AN'].astype(int)
-        else:
-            st.error("Column 'AN' (Year) not found! Temporal analysis by year will be limited.")
-            df['AN'] = np.nan # Ensure column exists even if empty
-
-        # Map 'JR_SEMN_ACCDN' (Day Type) to 'Weekday'/'Weekend'
-        if 'JR_SEMN_ACCDN' in df.columns:
-            df['JR_SEMN_ACCDN'] = df['JR_SEMN_ACCDN'].replace({'SEM': 'Weekday', 'FDS': 'Weekend'})
-        else:
-            st.warning("Column 'JR_SEMN_ACCDN' (Day Type) not found. Day Type analysis will be unavailable.")
-            df['JR_SEMN_ACCDN'] = np.nan
-
-        # Define 'quarter_day' from 'HR_ACCDN' (Hour Range)
-        if 'HR_ACCDN' in df.columns:
-            def get_quarter_day(hr_str):
-                if pd.isna(hr_str): return np.nan
-                # Extract first two digits as hour range indicator (e.g., '08' from '08:00:00-11:59:00')
-                try:
-                    start_hour_prefix = hr_str.split(':')[0]
-                    if start_hour_prefix.isdigit():
-                        start_hour = int(start_hour_prefix)
-                        if 0 <= start_hour < 6: return 'Night (0-5h)'
-                        elif 6 <= start_hour < 12: return 'Morning (6-11h)'
-                        elif 12 <= start_hour < 18: return 'Afternoon (12-17h)'
-                        else: return 'Evening (18-23h)'
-                    else:
-                        return 'Unknown Hour Format'
-                except (ValueError, IndexError):
-                    return 'Invalid Hour Data'
-            df['quarter_day'] = df['HR_ACCDN'].apply(get_quarter_day)
-            # st.info("Derived 'quarter_day' from 'HR_ACCDN'.")
-        else:
-            st.warning("Column 'HR_ACCDN' (Hour Range) not found. Quarter of Day analysis will be unavailable.")
-            df['quarter_day'] = np.nan
-
-        # Map 'GRAVITE' to desired labels for consistency
-        if 'GRAVITE' in df.columns:
-            df['GRAVITE'] = df['GRAVITE'].replace({
-                'Dommages matériels seulement': 'Matériels',
-                'Dommages matériels inférieurs au seuil de rapportage': 'Mineurs',
-                'Léger': 'Léger',
-                'Mortel ou grave': 'Grave'
-            })
-            # st.info("Mapped 'GRAVITE' labels.")
-        else:
-            st.error("Column 'GRAVITE' not found! Severity analysis will be limited.")
-            return pd.DataFrame() # Severity is critical, return empty DF if missing
-
-        # Add region coordinates for mapping
-        region_coords = {
-            'Bas-Saint-Laurent (01)': (48.5, -68.5), 'Saguenay/-Lac-Saint-Jean (02)': (48.4, -71.1),
-            'Capitale-Nationale (03)': (47.0, -71.2), 'Mauricie (04)': (46.5, -72.7),
-            'Estrie (05)': (45.4, -71.9), 'Montréal (06)': (45.5, -73.6),
-            'Outaouais (07)': (45.6, -76.0), 'Abitibi-Témiscamingue (08)': (48.1, -78.0),
-            'Côte-Nord (09)': (50.0, -63.0), 'Nord-du-Québec (10)': (52.0, -75.0),
-            'Gaspésie/-Îles-de-la-Madeleine (11)': (49.1, -65.4), 'Chaudière-Appalaches (12)': (46.5, -70.5),
-            'Laval (13)': (45.6, -73.8), 'Lanaudière (14)': (46.0, -73.4),
-            'Laurentides (15)': (46.5, -74.2), 'Montérégie (16)': (45.3, -73.0),
-            'Centre-du-Québec (17)': (46.0, -72.0)
-        }
-        if 'REG_ADM' in df.columns:
-            df['Region_Full'] = df['REG_ADM'].astype(str).str.strip() # Ensure string type before strip
-            # Clean region names to remove numbers in parentheses for simpler 'Region' column
-            df['Region'] = df['Region_Full'].str.replace(r'\s*\(\d+\)', '', regex=True).str.upper()
-
-            df['lat'] = df['Region_Full'].map(lambda x: region_coords.get(x, (np.nan, np.nan))[0] if pd.notna(x) else np.nan)
-            df['lon'] = df['Region_Full'].map(lambda x: region_coords.get(x, (np.nan, np.nan))[1] if pd.notna(x) else np.nan)
-            # st.info("Region coordinates mapped.")
-        else:
-            st.error("Column 'REG_ADM' not found! Map functionalities will be unavailable.")
-            df['Region_Full'] = np.nan
-            df['Region'] = np.nan
-            df['lat'] = np.nan
-            df['lon'] = np.nan
-
-        # Drop rows where lat/lon or Region are NaN, as these cannot be plotted on the map
-        initial_rows = len(df)
-        df_cleaned = df.dropna(subset=['lat', 'lon', 'Region'], how='any')
-        rows_dropped = initial_rows - len(df_cleaned)
-        # if rows_dropped > 0:
-            # st.warning(f"Dropped {rows_dropped} rows with missing map coordinates or region names for plotting.")
-        df = df_cleaned # Update df to the cleaned version
-        # st.success(f"Data preprocessing complete. Final DataFrame shape: {df.shape}")
-        return df
+        return load_cube(version)
     except FileNotFoundError:
         st.error("Error: 'assets/data_fusionnee.csv' not found. Please ensure the file is in the 'assets' directory.")
         st.stop() # Stop the app if crucial file is missing
@@ -125,19 +44,31 @@ def prep_data():
         st.exception(e) # Display full traceback in Streamlit
         st.stop() # Stop the app on critical error
 
+def count_accidents(cube, by, filters=None):
+    """
+    Counts accidents per page column from the cube, with the page labels:
+    'quarter_day' for QUARTER_DAY and 'Region' for REG_ADM. Accidents with a
+    missing key are left out, and so are those without a region, which the
+    page cannot place on the map.
+    """
+    dimensions = {column: dimension for dimension, column in COLUMNS.items()}
+    cube_filters = {'REG_ADM': NOT_MISSING}
+    cube_filters.update({dimensions.get(column, column): value for column, value in (filters or {}).items()})
+    counts = cube.count([dimensions.get(column, column) for column in by], cube_filters, labels=LABELS)
+    return counts.rename(columns=COLUMNS)
+
 # --- Helper Functions for Plotting ---
 
-def prepare_region_data(data_frame):
+def prepare_region_data(cube):
     """Aggregates accident counts per region for the map."""
     # st.info("Preparing region data for map...")
-    if data_frame.empty or 'Region' not in data_frame.columns or data_frame['Region'].empty:
-        st.warning("No 'Region' column or it's empty in input data for map preparation.")
+    region_counts = count_accidents(cube, ['Region']).rename(columns={'count': 'Accident Count'})
+    if region_counts.empty:
+        st.warning("No region data available for map preparation.")
         return pd.DataFrame()
 
-    region_counts = data_frame.groupby('Region').size().reset_index(name='Accident Count')
-    # Merge back with original df to get lat/lon for each region (ensure unique mapping)
-    region_coords_df = data_frame[['Region', 'lat', 'lon']].drop_duplicates(subset=['Region']).dropna(subset=['lat', 'lon'])
-    merged_df = pd.merge(region_counts, region_coords_df, on='Region', how='left')
+    # Attach the region centroids to the aggregated rows only
+    merged_df = attach(region_counts, 'Region')
     # st.info(f"Prepared map data shape: {merged_df.shape}")
     return merged_df
 
@@ -171,24 +102,42 @@ def draw_geo_map(data_frame, center_lat, center_lon, zoom):
     # st.success("Map figure created successfully.")
     return fig
 
-def create_bar_chart(data_frame, title, type_col, granularity_col):
-    """Creates a grouped bar chart by granularity and severity."""
+def region_map_chart(cube):
+    """Creates the map of the accidents per region, or an empty figure without region data."""
+    df_map_data = prepare_region_data(cube)
+    if df_map_data.empty:
+        st.warning("No map data available after aggregation. Displaying empty map.")
+        return go.Figure().update_layout(title="No map data to display.")
+    return draw_geo_map(df_map_data, center_lat=47.5, center_lon=-71.5, zoom=4.5)
+
+def severity_bar_chart(cube, title, granularity_col, filters=None):
+    """
+    Creates the bar chart of the accidents matching `filters` per granularity and
+    severity, or returns None if there are none.
+    """
+    counts = count_accidents(cube, [granularity_col, 'GRAVITE'], filters)
+    if counts.empty:
+        return None
+    return create_bar_chart(counts, title, 'GRAVITE', granularity_col)
+
+def create_bar_chart(grouped_df, title, type_col, granularity_col):
+    """Creates a grouped bar chart by granularity and severity, from the counts of `count_accidents`."""
     # st.info(f"Creating bar chart: '{title}' using granularity '{granularity_col}' and type '{type_col}'")
-    if data_frame.empty:
+    if grouped_df.empty:
         fig = go.Figure()
         fig.update_layout(title=f"No data for {title}", xaxis={"visible": False}, yaxis={"visible": False})
         st.warning(f"Empty DataFrame passed to create_bar_chart for '{title}'.")
         return fig
 
     # Ensure required columns exist
-    if granularity_col not in data_frame.columns or type_col not in data_frame.columns:
-        st.error(f"Missing required columns for bar chart '{title}': '{granularity_col}' or '{type_col}'. Dataframe columns: {data_frame.columns.tolist()}")
+    if granularity_col not in grouped_df.columns or type_col not in grouped_df.columns:
+        st.error(f"Missing required columns for bar chart '{title}': '{granularity_col}' or '{type_col}'. Dataframe columns: {grouped_df.columns.tolist()}")
         fig = go.Figure()
         fig.update_layout(title=f"Error: Missing columns for '{title}'")
         return fig
 
-    # Group by granularity and severity
-    grouped_df = data_frame.groupby([granularity_col, type_col]).size().reset_index(name='Count')
+    # One row per granularity and severity
+    grouped_df = grouped_df.rename(columns={'count': 'Count'})
     # st.info(f"Grouped DataFrame shape for bar chart '{title}': {grouped_df.shape}")
 
     # Define a consistent order for severity
@@ -210,8 +159,8 @@ def create_bar_chart(data_frame, title, type_col, granularity_col):
     elif granularity_col == 'JR_SEMN_ACCDN': # Original Day Type column
         order_dict = {'JR_SEMN_ACCDN': ['Weekday', 'Weekend']}
     elif granularity_col == 'AN': # For Year
-        if 'AN' in data_frame.columns:
-             order_dict = {'AN': sorted(data_frame['AN'].dropna().astype(int).unique().tolist())}
+        if 'AN' in grouped_df.columns:
+             order_dict = {'AN': sorted(grouped_df['AN'].dropna().astype(int).unique().tolist())}
         else:
             st.warning("Year column 'AN' not available for ordering.")
             order_dict = None
@@ -238,11 +187,13 @@ def create_bar_chart(data_frame, title, type_col, granularity_col):
 
 # --- Main Streamlit App Layout Function ---
 def show_temporal_spatial_page():
-    # Load data once for the page. This function handles caching internally.
-    df = prep_data()
+    # Load data once for the page, for the data version of this run. This function
+    # handles caching internally.
+    version = data_version()
+    cube = prep_data(version)
 
-    if df.empty:
-        st.error("Data loading failed or resulted in an empty DataFrame. Cannot render the full page.")
+    if not cube.rows:
+        st.error("Data loading failed or resulted in no accidents. Cannot render the full page.")
         return # Stop rendering if no data is available
 
     # --- Session State Initialization ---
@@ -270,12 +221,8 @@ def show_temporal_spatial_page():
     with col_map:
         st.subheader("Accidents by Region (Click on a region)")
 
-        df_map_data = prepare_region_data(df)
-        if df_map_data.empty:
-            st.warning("No map data available after aggregation. Displaying empty map.")
-            fig_map = go.Figure().update_layout(title="No map data to display.")
-        else:
-            fig_map = draw_geo_map(df_map_data, center_lat=47.5, center_lon=-71.5, zoom=4.5)
+        # The map is the same for every session: built once per data version
+        fig_map = cached_figure('temporal_spatial', 'region map', (), lambda: region_map_chart(cube), version)
 
         try:
             map_chart_selection = st.plotly_chart(
@@ -344,15 +291,19 @@ def show_temporal_spatial_page():
 
         if st.session_state['selected_region']:
             # st.info(f"Attempting to show data for: **{st.session_state['selected_region']}** using '{granularity_region_col}' granularity.")
-            filtered_df_region = df[df['Region'] == st.session_state['selected_region']].copy()
-
-            if not filtered_df_region.empty:
-                fig_region_bar = create_bar_chart(
-                    filtered_df_region,
-                    f"Accidents in {st.session_state['selected_region']} by {granularity_region_selector['label']}",
-                    'GRAVITE',
-                    granularity_region_col
-                )
+            selected_region = st.session_state['selected_region']
+            fig_region_bar = cached_figure(
+                'temporal_spatial', 'region bars', (selected_region, granularity_region_col),
+                lambda: severity_bar_chart(
+                    cube,
+                    f"Accidents in {selected_region} by {granularity_region_selector['label']}",
+                    granularity_region_col,
+                    {'Region': selected_region}
+                ),
+                version
+            )
+
+            if fig_region_bar is not None:
                 st.plotly_chart(fig_region_bar, use_container_width=True)
                 # st.success(f"Regional chart for {st.session_state['selected_region']} displayed.")
             else:
@@ -397,13 +348,16 @@ def show_temporal_spatial_page():
     granularity_global_col = granularity_global_selector['value']
     # st.info(f"Global chart granularity selected: {granularity_global_col}")
 
-    if not df.empty:
-        fig_global_bar = create_bar_chart(
-            df, # Use the full DataFrame for global view
+    fig_global_bar = cached_figure(
+        'temporal_spatial', 'global bars', (granularity_global_col,),
+        lambda: severity_bar_chart(
+            cube, # Counts over all accidents for the global view
             f"Accidents by {granularity_global_selector['label']} (Global)",
-            'GRAVITE',
             granularity_global_col
-        )
+        ),
+        version
+    )
+    if fig_global_bar is not None:
         st.plotly_chart(fig_global_bar, use_container_width=True)
         # st.success("Global chart displayed.")
     else:
@@ -0,0 +1,345 @@
+'''
+    Charts of the accident visualizations page: user types and pairs
+    of them, severity per month, severe accidents per region and month,
+    and severity per time unit. They are drawn from the shared accident data and cube of
+    counts, and kept here so that the ingest can prerender them (see
+    prerender.py).
+'''
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+from pages.utils.labels import SEVERITY_LABELS, WEEK_TYPE_LABELS
+from pages.utils.regions import REGIONS
+from pages.utils.user_types import USER_TYPE_LABELS, combination_counts, pair_counts, type_counts
+
+# Region names without their number, applied to the counts of the cube (the
+# severities and week types use `SEVERITY_LABELS` and `WEEK_TYPE_LABELS`, see labels.py)
+REGION_NAMES = dict(zip(REGIONS['label'], REGIONS['name']))
+
+# Granularities of the severity by time chart
+GRANULARITIES = ['Month', 'Week Type', 'Hour Range']
+
+
+def _period_combinations(df_data, period_type):
+    '''
+    Returns:
+        np.ndarray: The accidents of `period_type` ('Day' or 'Night') per
+        combination of user types, see user_types.py, or None if the
+        period has no accident
+    '''
+    periods = list(df_data['DAY_NIGHT'].cat.categories)
+    if period_type not in periods:
+        return None
+    counts = combination_counts(df_data, by='DAY_NIGHT')[periods.index(period_type)]
+    return counts if counts.any() else None
+
+
+def _missing_user_type_columns(df_data):
+    '''
+    Returns:
+        go.Figure: An empty figure if the data lacks the columns of the user
+        type charts, else None
+    '''
+    missing = [col for col in ['USER_TYPES', 'DAY_NIGHT'] if col not in df_data.columns]
+    if not missing:
+        return None
+    st.warning(f"Columns {missing} not found in data for user type analysis.")
+    fig = go.Figure()
+    fig.update_layout(
+        title="No relevant user type data columns found.",
+        xaxis_title="User Type",
+        yaxis_title="Number of Accidents"
+    )
+    return fig
+
+
+def accidents_by_user_type_chart(df_data, period_type='Day'):
+    '''
+    Creates a bar chart for accidents by user type, filtered by Day or Night.
+    period_type: 'Day' or 'Night'
+    '''
+    # The road-user flags are packed at ingest into the USER_TYPES bitfield and
+    # 'DAY_NIGHT' is precomputed (from the start of HR_ACCDN: Day from 6 AM to 7:59 PM,
+    # Night otherwise), so the rows are counted once per combination of user types and
+    # period with a bincount; the count of each user type is read from its combinations
+    fig = _missing_user_type_columns(df_data)
+    if fig is not None:
+        return fig
+
+    period_counts = _period_combinations(df_data, period_type)
+
+    # Check if the period has no accident
+    if period_counts is None:
+        fig = go.Figure()
+        fig.update_layout(
+            title=f"No data available for User Type in {period_type} period",
+            xaxis_title="User Type",
+            yaxis_title="Number of Accidents"
+        )
+        return fig
+
+    # Accidents of the period involving each user type
+    counts = pd.Series(type_counts(period_counts), index=USER_TYPE_LABELS, dtype='int64').sort_values(ascending=False)
+
+    fig = go.Figure(go.Bar(
+        x=counts.index,
+        y=counts.values,
+        name=period_type,
+        marker_color=px.colors.qualitative.Plotly[0] if period_type == 'Day' else px.colors.qualitative.Plotly[1]
+    ))
+
+    fig.update_layout(
+        title=f"Number of Accidents by User Type - {period_type}",
+        xaxis_title="User Type",
+        yaxis_title="Number of Accidents",
+        template="plotly_white",
+        hovermode="x unified"
+    )
+    return fig
+
+
+def user_type_pairs_chart(df_data, period_type='Day'):
+    '''
+    Creates a heatmap of the accidents involving two user types together (e.g. pedestrians
+    and heavy vehicles), filtered by Day or Night. The diagonal counts each user type.
+    period_type: 'Day' or 'Night'
+    '''
+    fig = _missing_user_type_columns(df_data)
+    if fig is not None:
+        return fig
+
+    period_counts = _period_combinations(df_data, period_type)
+
+    if period_counts is None:
+        fig = go.Figure()
+        fig.update_layout(
+            title=f"No data available for User Type Pairs in {period_type} period",
+            xaxis={"visible": False},
+            yaxis={"visible": False}
+        )
+        return fig
+
+    # Accidents of the period involving both user types of each cell, from the counts
+    # per combination of user types
+    z_values = pair_counts(period_counts)
+
+    hover_text = [[f"{z_values[i, j]} accidents involving {USER_TYPE_LABELS[i]}" if i == j else
+                   f"{z_values[i, j]} accidents involving {USER_TYPE_LABELS[i]} and {USER_TYPE_LABELS[j]}"
+                   for j in range(len(USER_TYPE_LABELS))] for i in range(len(USER_TYPE_LABELS))]
+
+    fig = go.Figure(data=go.Heatmap(
+        z=z_values,
+        x=USER_TYPE_LABELS,
+        y=USER_TYPE_LABELS,
+        text=hover_text,
+        hoverinfo="text", # Show custom hover text
+        colorscale='Blues',
+        colorbar=dict(title="Accidents")
+    ))
+
+    fig.update_layout(
+        title=f"Accidents Involving Two User Types - {period_type}",
+        xaxis_title="User Type",
+        yaxis_title="User Type",
+        template="plotly_white"
+    )
+    return fig
+
+
+def accident_severity_month_chart(cube, period_type='Day'):
+    '''
+    Creates a stacked bar chart for accident severity by month, filtered by Day or Night.
+    period_type: 'Day' or 'Night'
+    '''
+    severity_order = ["Severe", "Minor", "Material Damage", "Low Damage"] # Use English labels
+
+    # Counts per severity and month (1-12) for the selected period, read from the cube
+    # as a dense table, so months without accidents are already there as zeros.
+    # 'DAY_NIGHT' is precomputed at ingest, with the same rule as the user type chart;
+    # accidents missing the month, severity or period are left out.
+    _, counts = cube.table(['GRAVITE', 'MS_ACCDN'], {'DAY_NIGHT': period_type},
+                           labels={'GRAVITE': SEVERITY_LABELS},
+                           axes={'GRAVITE': severity_order, 'MS_ACCDN': range(1, 13)})
+
+    if not counts.any():
+        fig = go.Figure()
+        fig.update_layout(
+            title=f"No data available for Monthly Severity in {period_type} period",
+            xaxis_title="Month",
+            yaxis_title="Number of Accidents"
+        )
+        return fig
+
+    month_labels = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                    'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    color_map = {
+        "Severe": "darkred",
+        "Minor": "lightgreen",
+        "Material Damage": "steelblue",
+        "Low Damage": "lightgrey"
+    }
+
+    fig = go.Figure()
+    for grav, month_counts in zip(severity_order, counts):
+        fig.add_trace(go.Bar(
+            x=month_labels, # Use month names for x-axis
+            y=month_counts,
+            name=grav,
+            marker_color=color_map.get(grav, 'gray')
+        ))
+
+    fig.update_layout(
+        title=f"Monthly Accident Severity ({period_type}time)",
+        xaxis_title="Month",
+        yaxis_title="Number of Accidents",
+        barmode='stack',
+        template="plotly_white",
+        hoverlabel=dict(
+            bgcolor="white",
+            font=dict(color="black")
+        )
+    )
+    return fig
+
+
+def generate_severe_accidents_heatmap_chart(cube):
+    '''
+    Generates a heatmap of severe accidents by region and month.
+    '''
+    month_map = {
+        1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr',
+        5: 'May', 6: 'Jun', 7: 'Jul', 8: 'Aug',
+        9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'
+    }
+
+    # Severe accidents per region (named without its number) and month (1-12), read from
+    # the cube as a dense table: rows are regions, columns are months in order
+    (regions, _), counts = cube.table(['REG_ADM', 'MS_ACCDN'], {'GRAVITE': 'Mortel ou grave'},
+                                      labels={'REG_ADM': REGION_NAMES},
+                                      axes={'MS_ACCDN': range(1, 13)})
+
+    if not counts.any():
+        fig = go.Figure()
+        fig.update_layout(
+            title="No severe accident data to display for heatmap.",
+            xaxis={"visible": False},
+            yaxis={"visible": False}
+        )
+        return fig
+
+    # Regions with severe accidents, in alphabetical order
+    rows = [i for i in np.argsort(regions, kind='stable') if counts[i].any()]
+
+    x_labels = list(month_map.values()) # Month abbreviations for x-axis
+    y_labels = [regions[i] for i in rows] # Region names for y-axis
+    z_values = counts[rows] # Accident counts
+
+    # Construction of hover text for rich tooltips
+    hover_text = [[f"{val} severe accidents in {y_labels[i]} during {x_labels[j]}"
+                   for j, val in enumerate(row)] for i, row in enumerate(z_values)]
+
+    fig = go.Figure(data=go.Heatmap(
+        z=z_values,
+        x=x_labels,
+        y=y_labels,
+        text=hover_text,
+        hoverinfo="text", # Show custom hover text
+        colorscale='Reds', # Red color scale for severity
+        colorbar=dict(title="Accidents")
+    ))
+
+    fig.update_layout(
+        title="Severe Accidents by Region and Month (Hover for Details)",
+        xaxis_title="Month",
+        yaxis_title="Administrative Region",
+        template="plotly_white",
+        height=800 # Set a reasonable height
+    )
+    return fig
+
+
+def generate_accident_severity_bar_chart_by_time(cube, granularity_type='Month'):
+    '''
+    Generates a stacked bar chart for accident severity by month, week type, or hour range.
+    granularity_type: 'Month', 'Week Type', or 'Hour Range'
+    '''
+    # Labels and order for display
+    month_labels = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                    'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    weektype_order = ['Weekday', 'Weekend']
+    hour_order = [
+        '00:00:00-03:59:00', '04:00:00-07:59:00',
+        '08:00:00-11:59:00', '12:00:00-15:59:00',
+        '16:00:00-19:59:00', '20:00:00-23:59:00'
+    ]
+
+    severity_order = ["Severe", "Minor", "Material Damage", "Low Damage"]
+    color_map = {
+        "Severe": "darkred",
+        "Minor": "lightgreen",
+        "Material Damage": "steelblue",
+        "Low Damage": "lightgrey"
+    }
+
+    # Counts per month, week type, hour range and severity, read from the cube as a dense
+    # table with every axis in display order. Accidents missing one of them are left out,
+    # whichever the granularity.
+    granularity_axes = {'Month': 0, 'Week Type': 1, 'Hour Range': 2}
+    _, counts = cube.table(['MS_ACCDN', 'JR_SEMN_ACCDN', 'HR_ACCDN', 'GRAVITE'],
+                           labels={'GRAVITE': SEVERITY_LABELS, 'JR_SEMN_ACCDN': WEEK_TYPE_LABELS},
+                           axes={'MS_ACCDN': range(1, 13), 'JR_SEMN_ACCDN': weektype_order,
+                                 'HR_ACCDN': hour_order, 'GRAVITE': severity_order})
+
+    fig = go.Figure()
+    title = ""
+    x_axis_title = ""
+    plot_data = np.zeros((0, len(severity_order)), dtype=np.int64)
+    x_labels = []
+
+    if granularity_type == 'Month':
+        title = "Accident Severity by Month"
+        x_axis_title = "Month"
+        x_labels = month_labels
+    elif granularity_type == 'Week Type':
+        title = "Accident Severity by Week Type"
+        x_axis_title = "Day Type"
+        x_labels = weektype_order
+    elif granularity_type == 'Hour Range':
+        title = "Accident Severity by Time of Day"
+        x_axis_title = "Hour Range"
+        x_labels = hour_order
+
+    if granularity_type in granularity_axes:
+        # Sum out the two other time axes: rows are the x values, columns the severities
+        other_axes = tuple(axis for axis in granularity_axes.values() if axis != granularity_axes[granularity_type])
+        plot_data = counts.sum(axis=other_axes)
+
+    if not plot_data.any():
+        fig = go.Figure()
+        fig.update_layout(title=f"No data for {granularity_type}", xaxis_title=x_axis_title, yaxis_title="Number of Accidents")
+        return fig
+
+    # Add traces for all severities based on the selected granularity
+    for grav, y_values in zip(severity_order, plot_data.T):
+        fig.add_trace(go.Bar(
+            x=x_labels,
+            y=y_values,
+            name=grav,
+            marker_color=color_map.get(grav, 'gray')
+        ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title=x_axis_title,
+        yaxis_title="Number of Accidents",
+        barmode='stack',
+        template="plotly_white",
+        hoverlabel=dict(
+            bgcolor="white",
+            font=dict(color="black")
+        )
+    )
+    return fig
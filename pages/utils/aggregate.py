@@ -0,0 +1,78 @@
+'''
+    Counting kernel over integer codes.
+
+    A count per combination of a few key columns is computed without a
+    groupby: each key is encoded once as small integer codes (category
+    codes, or the index of the value among the sorted distinct values),
+    the codes of the keys are combined into one flat cell index, and a
+    single `np.bincount` counts every cell. The result is a dense array
+    with one axis per key, so combinations that never occur are already
+    there as zeros, in the order of the axis values.
+'''
+import numpy as np
+import pandas as pd
+
+
+def encode(column, levels=None):
+    '''
+    Encodes a key column as integer codes.
+
+    Args:
+        column (pd.Series): The key column
+        levels (list): The values to encode, in axis order. Defaults to
+            the categories of a categorical column, or else its sorted
+            distinct values
+    Returns:
+        tuple: The levels (a pd.Index) and the code of each row, as an
+        int64 array; -1 for missing values and values not in `levels`
+    '''
+    categorical = isinstance(column.dtype, pd.CategoricalDtype)
+    if levels is not None:
+        levels = pd.Index(levels)
+        if categorical:
+            # Recode the categories, not the rows
+            recode = np.append(levels.get_indexer(column.cat.categories), -1)
+            return levels, recode[column.cat.codes.to_numpy()]
+        return levels, levels.get_indexer(column)
+    if categorical:
+        return column.cat.categories, column.cat.codes.to_numpy().astype(np.int64)
+    if pd.api.types.is_numeric_dtype(column.dtype):
+        values = column.to_numpy(dtype='float64', na_value=np.nan)
+        missing = np.isnan(values)
+        levels = pd.Index(np.unique(values[~missing]).astype(np.int64))
+        codes = np.searchsorted(levels.to_numpy(), values)
+        codes[missing] = -1
+        return levels, codes
+    codes, levels = pd.factorize(column, sort=True)
+    return levels, codes.astype(np.int64)
+
+
+def count_codes(codes, shape, weights=None):
+    '''
+    Counts the rows per combination of integer keys, with one bincount.
+
+    Args:
+        codes (list): One code array per key (at least one), below
+            the size of its axis; -1 marks rows to leave out
+        shape (tuple): The number of levels of each key
+        weights (np.ndarray): Count of each row, defaults to one
+    Returns:
+        np.ndarray: The int64 counts, of shape `shape`
+    '''
+    shape = tuple(int(size) for size in shape)
+    keep = None
+    for code in codes:
+        if code.size and code.min() < 0:
+            keep = code >= 0 if keep is None else keep & (code >= 0)
+    if keep is not None:
+        codes = [code[keep] for code in codes]
+        if weights is not None:
+            weights = weights[keep]
+    # Row-major cell index, accumulated in place (np.ravel_multi_index
+    # checks every code against its bound, and is 3 times slower)
+    flat = codes[0].astype(np.int64)
+    for code, size in zip(codes[1:], shape[1:]):
+        flat *= size
+        flat += code
+    counts = np.bincount(flat, weights=weights, minlength=int(np.prod(shape)))
+    return counts.astype(np.int64, copy=False).reshape(shape)
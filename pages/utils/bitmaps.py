@@ -0,0 +1,79 @@
+'''
+    Bitmap indexes over the filterable columns of a table.
+
+    Each (column, value) pair gets a bitmap with one bit per row, packed
+    in 64-bit words: 8 times smaller than a boolean mask, and 73 KB for
+    the 584k accidents. Any combination of equality filters resolves
+    with a bitwise AND of one bitmap per active filter, into a single
+    buffer. The index backs the facet counts of the dashboard filters
+    (see facets.py): one popcount per value, with no mask, filtered
+    frame or string comparison built per filter.
+'''
+import numpy as np
+import pandas as pd
+
+# Set bits of every byte, where np.bitwise_count (numpy 2) is missing
+_BYTE_COUNTS = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+
+def pack(mask):
+    '''
+    Packs a boolean mask into a bitmap of 64-bit words, zero padded.
+    '''
+    bits = np.packbits(mask)
+    words = np.zeros(-(-len(bits) // 8) * 8, dtype=np.uint8)
+    words[:len(bits)] = bits
+    return words.view(np.uint64)
+
+
+def popcount(bitmap):
+    '''
+    Returns:
+        int: The number of set bits of `bitmap`
+    '''
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(bitmap).sum())
+    return int(_BYTE_COUNTS[bitmap.view(np.uint8)].sum())
+
+
+class BitmapIndex:
+    '''
+    One bitmap per value of each indexed column. Missing values are in
+    no bitmap, so they match no filter.
+
+    Args:
+        df (pd.DataFrame): The table to index
+        columns (list): The columns to index
+    '''
+
+    def __init__(self, df, columns):
+        self.rows = len(df)
+        self.bitmaps = {}
+        for column in columns:
+            values = df[column]
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype('category')
+            codes = values.cat.codes.to_numpy()
+            self.bitmaps[column] = {value: pack(codes == code)
+                                    for code, value in enumerate(values.cat.categories.tolist())}
+        self._all = pack(np.ones(self.rows, dtype=bool))
+
+    def match(self, filters):
+        '''
+        Computes the rows matching every filter.
+
+        Args:
+            filters (dict): Column to required value, None meaning no
+                filter
+        Returns:
+            np.ndarray: Bitmap of the matching rows, not to be modified
+        '''
+        bitmaps = [self.bitmaps[column].get(value) for column, value in filters.items() if value is not None]
+        if not bitmaps:
+            return self._all
+        if any(bitmap is None for bitmap in bitmaps):
+            return np.zeros_like(self._all)
+        selected = bitmaps[0].copy()
+        for bitmap in bitmaps[1:]:
+            np.bitwise_and(selected, bitmap, out=selected)
+        return selected
@@ -0,0 +1,411 @@
+'''
+    In-memory cube of accident counts, shared by all pages.
+
+    Almost every chart is a count of accidents grouped by a few of the
+    `DIMENSIONS`, among those matching a few filters. The cube encodes
+    each dimension once per data version as small integer codes, then
+    answers such queries from count tables instead of the accident rows.
+
+    One table over every dimension would hold almost one cell per
+    accident, so the cube materializes a sparse table (cuboid) per set
+    of dimensions a query uses, with one cell per observed combination.
+    Cuboids are built on first use with a single pass over the codes,
+    kept for the next queries (the least recently used ones are dropped
+    past `MAX_CUBOIDS`), and each query only scans the cells of one.
+
+    With the 'duckdb' backend (ACCIDENTS_QUERY_BACKEND environment
+    variable), each query is instead one SQL filter and GROUP BY over
+    the codes, scanned in place by DuckDB, so only the counted cells
+    come back to Python and nothing is kept between queries. Both
+    backends return the same counts.
+'''
+import bisect
+import collections
+import functools
+import os
+import threading
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+from pages.utils.aggregate import count_codes, encode
+from pages.utils.dataset import DERIVED_SCHEMA, data_version, load_dataset
+
+# Dimensions of the cube. The columns of DERIVED_SCHEMA (DAY_NIGHT,
+# QUARTER_DAY, SEASON, SEVERE_FLAG) are coarser levels of some of them.
+DIMENSIONS = [
+    'AN', 'MS_ACCDN', 'HR_ACCDN', 'JR_SEMN_ACCDN', 'GRAVITE', 'REG_ADM',
+    'CD_COND_METEO', 'CD_ETAT_SURFC', 'CD_ECLRM', 'CD_ENVRN_ACCDN',
+    'CD_CATEG_ROUTE', 'CD_CONFG_ROUTE', 'CD_ASPCT_ROUTE', 'CD_ZON_TRAVX_ROUTR'
+] + list(DERIVED_SCHEMA)
+
+# Cuboids kept in memory; each holds at most one cell per accident
+MAX_CUBOIDS = 64
+
+# Where the counts of a query come from: the cuboids ('cube', the default)
+# or a DuckDB query over the codes ('duckdb')
+BACKENDS = ('cube', 'duckdb')
+BACKEND = os.environ.get('ACCIDENTS_QUERY_BACKEND', 'cube')
+if BACKEND not in BACKENDS:
+    raise ValueError(f'Unknown ACCIDENTS_QUERY_BACKEND {BACKEND!r}, expected one of {BACKENDS}')
+
+# Filter value keeping the accidents where a dimension is known, whatever
+# its level
+NOT_MISSING = object()
+# Group of the accidents missing a dimension, in the axes of `Cube.table`
+MISSING = object()
+
+# Above this many possible cells, cells are found by sorting instead of
+# with a dense count array
+DENSE_CELLS = 1 << 24
+
+
+def _encode(column):
+    '''
+    Encodes a dimension column, see `encode`.
+
+    Returns:
+        tuple: The levels of the column (its categories, or its sorted
+        distinct values) and the level index of each row, missing values
+        getting the extra index len(levels), in the smallest unsigned
+        type holding it (one byte for every dimension of the data)
+    '''
+    levels, codes = encode(column)
+    codes[codes < 0] = len(levels)
+    return levels, codes.astype(np.min_scalar_type(len(levels)))
+
+
+_local = threading.local()
+
+
+@functools.cache
+def _database():
+    return duckdb.connect()
+
+
+def _cursor():
+    '''
+    DuckDB connections are not thread safe: each thread serving a
+    session gets its own cursor on the in-memory database.
+    '''
+    if not hasattr(_local, 'cursor'):
+        _local.cursor = _database().cursor()
+    return _local.cursor
+
+
+class Cube:
+    '''
+    Accident counts over the `DIMENSIONS` of the data.
+
+    Args:
+        df (pd.DataFrame): The accident data, with every dimension
+        dimensions (list): The dimension columns
+        backend (str): One of `BACKENDS`, defaults to `BACKEND`
+    '''
+
+    def __init__(self, df, dimensions=DIMENSIONS, backend=None):
+        self.backend = backend or BACKEND
+        if self.backend not in BACKENDS:
+            raise ValueError(f'Unknown query backend {self.backend!r}, expected one of {BACKENDS}')
+        self.rows = len(df)
+        self.levels = {}
+        self.codes = {}
+        self.dtypes = {}
+        # Unlabelled groups of each dimension, see `_groups`
+        self._levels = {}
+        for dimension in dimensions:
+            levels, self.codes[dimension] = _encode(df[dimension])
+            self.levels[dimension] = levels.tolist()
+            self.dtypes[dimension] = df[dimension].dtype
+            self._levels[dimension] = (self.levels[dimension],
+                                       {level: index for index, level in enumerate(self.levels[dimension])},
+                                       np.append(np.arange(len(levels)), -1))
+        self._cuboids = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # Arrow view of the codes, without a copy, for DuckDB to scan
+        self._table = pa.table(self.codes) if self.backend == 'duckdb' else None
+
+    def _shape(self, dimensions):
+        # One extra slot per dimension for the missing values
+        return tuple(len(self.levels[dimension]) + 1 for dimension in dimensions)
+
+    def _build(self, dimensions):
+        '''
+        Counts the accidents per observed combination of `dimensions`.
+
+        Returns:
+            tuple: The level index of each cell per dimension (a
+            cells x dimensions array) and the count of each cell
+        '''
+        shape = self._shape(dimensions)
+        codes = [self.codes[dimension] for dimension in dimensions]
+        if np.prod(shape) <= DENSE_CELLS:
+            counts = count_codes(codes, shape).ravel()
+            cells = np.flatnonzero(counts)
+            counts = counts[cells]
+        else:
+            cells, counts = np.unique(np.ravel_multi_index([code.astype(np.intp) for code in codes], shape),
+                                      return_counts=True)
+        return np.stack(np.unravel_index(cells, shape), axis=1).astype(np.min_scalar_type(max(shape))), counts
+
+    def _key(self, dimensions):
+        order = list(self.codes)
+        return tuple(sorted(dimensions, key=order.index))
+
+    def _cached(self, key, build):
+        '''
+        Returns the table cached under `key`, building it on first use.
+        Cuboids and cumulative tables share the `MAX_CUBOIDS` entries.
+        '''
+        with self._lock:
+            if key in self._cuboids:
+                self._cuboids.move_to_end(key)
+                return self._cuboids[key]
+        # Built outside the lock: concurrent first uses just build it twice
+        table = build()
+        with self._lock:
+            self._cuboids[key] = table
+            while len(self._cuboids) > MAX_CUBOIDS:
+                self._cuboids.popitem(last=False)
+        return table
+
+    def cuboid(self, dimensions):
+        '''
+        Returns the cuboid of a set of dimensions, building it on first
+        use. See `_build`.
+        '''
+        key = self._key(dimensions)
+        return key, self._cached(key, lambda: self._build(key))
+
+    def _build_cumulative(self, dimension, key):
+        '''
+        Accumulates the cuboid of `key` and `dimension` along the levels
+        of `dimension`.
+
+        Returns:
+            tuple: The cells of the cuboid of `key` and, for each level
+            of `dimension` and an initial zero row, the count of each
+            cell over the levels up to it (a (levels + 1) x cells array).
+            Accidents missing `dimension` are left out
+        '''
+        full_key, (cells, counts) = self.cuboid(set(key) | {dimension})
+        axis = full_key.index(dimension)
+        others = [index for index in range(len(full_key)) if index != axis]
+        shape = self._shape(key)
+        found, inverse = np.unique(np.ravel_multi_index(cells[:, others].T.astype(np.int64), shape),
+                                   return_inverse=True)
+        levels = len(self.levels[dimension])
+        position = cells[:, axis].astype(np.int64)
+        # The missing slot of `dimension` is past the last level: counting
+        # one level more than there are drops it
+        position[position >= levels] = -1
+        table = count_codes([position, inverse], (levels, len(found)), weights=counts)
+        cumulative = np.zeros((levels + 1, len(found)), dtype=np.int64)
+        np.cumsum(table, axis=0, out=cumulative[1:])
+        return np.stack(np.unravel_index(found, shape), axis=1).astype(cells.dtype), cumulative
+
+    def span(self, dimension, first, last, dimensions):
+        '''
+        Counts the accidents per observed combination of `dimensions`,
+        among those whose `dimension` lies between `first` and `last`
+        (included). Reads two rows of the cumulative table of
+        `dimensions` along `dimension` (built on first use), so the cost
+        does not depend on the number of levels in the range.
+
+        Returns:
+            tuple: The key of `dimensions`, and the cells and counts of
+            the combinations as in a cuboid. Cells may count zero
+        '''
+        key = self._key(dimensions)
+        cells, cumulative = self._cached((dimension, key), lambda: self._build_cumulative(dimension, key))
+        levels = self.levels[dimension]
+        start, stop = bisect.bisect_left(levels, first), bisect.bisect_right(levels, last)
+        return key, (cells, cumulative[max(stop, start)] - cumulative[start])
+
+    def _groups(self, dimension, labels):
+        '''
+        Returns:
+            tuple: The groups of a dimension (its levels, or their
+            distinct labels), the index of each group, and the group
+            index of each level slot, -1 for the missing slot and
+            unlabelled levels
+        '''
+        if dimension not in labels:
+            return self._levels[dimension]
+        mapping = labels[dimension]
+        # Labels in the order of their first level
+        names = [mapping[level] for level in self.levels[dimension] if mapping.get(level) is not None]
+        names = list(dict.fromkeys(names))
+        positions = {name: index for index, name in enumerate(names)}
+        groups = [positions.get(mapping.get(level), -1) for level in self.levels[dimension]]
+        return names, positions, np.array(groups + [-1])
+
+    def _column(self, dimension, names, indexes, labels):
+        if dimension in labels:
+            return pd.Categorical.from_codes(indexes, categories=names)
+        if isinstance(self.dtypes[dimension], pd.CategoricalDtype):
+            return pd.Categorical.from_codes(indexes, dtype=self.dtypes[dimension])
+        return np.array(names)[indexes]
+
+    def _slots(self, dimension, value, labels):
+        '''
+        Returns:
+            np.ndarray: Whether each level slot of `dimension`, then the
+            missing slot, matches the filter `value`
+        '''
+        levels = self.levels[dimension]
+        if value is NOT_MISSING:
+            # The missing slot is past the last level
+            return np.arange(len(levels) + 1) < len(levels)
+        if isinstance(value, tuple):
+            first, last = value
+            return np.array([first <= level <= last for level in levels] + [False])
+        _, positions, groups = self._groups(dimension, labels)
+        if value not in positions:
+            return np.zeros(len(levels) + 1, dtype=bool)
+        return groups == positions[value]
+
+    def query(self, dimensions, filters, labels=None):
+        '''
+        Counts the accidents matching `filters` per observed combination
+        of `dimensions`, with one DuckDB query over the codes.
+
+        Args:
+            dimensions (set): Dimensions to count by, among which every
+                filtered one
+            filters, labels: See `count`
+        Returns:
+            tuple: The key of `dimensions`, and the cells and counts of
+            the combinations as in a cuboid
+        '''
+        key = self._key(dimensions)
+        conditions = ['TRUE']
+        for dimension, value in filters.items():
+            codes = ', '.join(map(str, np.flatnonzero(self._slots(dimension, value, labels or {}))))
+            conditions.append(f'"{dimension}" IN ({codes})' if codes else 'FALSE')
+        columns = ', '.join(f'"{dimension}"' for dimension in key)
+        cursor = _cursor()
+        # Registering an Arrow table only creates a view over its buffers
+        cursor.register('codes', self._table)
+        result = cursor.execute(f'SELECT {columns}{", " if key else ""}count(*) AS count FROM codes '
+                                f'WHERE {" AND ".join(conditions)} GROUP BY ALL').fetchnumpy()
+        counts = result['count'].astype(np.int64)
+        cells = np.array([result[dimension] for dimension in key]).T.reshape(len(counts), len(key))
+        return key, (cells.astype(np.min_scalar_type(max(self._shape(key), default=1))), counts)
+
+    def _totals(self, by, filters, labels, missing=False):
+        '''
+        Returns:
+            tuple: The groups of each `by` dimension and the dense
+            counts, with one axis per `by` dimension. With `missing`,
+            the accidents missing a `by` dimension are counted in a
+            last `MISSING` group
+        '''
+        labels = labels or {}
+        filters = {dimension: value for dimension, value in (filters or {}).items() if value is not None}
+        ranges = [dimension for dimension, value in filters.items() if isinstance(value, tuple)]
+        if len(ranges) > 1:
+            raise ValueError(f'Only one range filter per query, got {ranges}')
+        if self.backend == 'duckdb':
+            key, (cells, counts) = self.query(set(by) | set(filters), filters, labels)
+        elif ranges and ranges[0] not in by:
+            dimension = ranges[0]
+            first, last = filters.pop(dimension)
+            key, (cells, counts) = self.span(dimension, first, last, set(by) | set(filters))
+        else:
+            key, (cells, counts) = self.cuboid(set(by) | set(filters))
+        axes = {dimension: axis for axis, dimension in enumerate(key)}
+
+        mask = np.ones(len(counts), dtype=bool)
+        for dimension, value in filters.items():
+            mask &= self._slots(dimension, value, labels)[cells[:, axes[dimension]]]
+
+        names, keys = [], []
+        for dimension in by:
+            dimension_names, _, groups = self._groups(dimension, labels)
+            if missing:
+                groups = np.append(groups[:-1], len(dimension_names))
+                dimension_names = [*dimension_names, MISSING]
+            names.append(dimension_names)
+            keys.append(groups[cells[mask, axes[dimension]]])
+        return names, count_codes(keys, [len(group) for group in names], weights=counts[mask])
+
+    def count(self, by, filters=None, labels=None):
+        '''
+        Counts the accidents matching `filters` for each combination of
+        the `by` dimensions, like `groupby(by).size()` over the rows.
+        Accidents with a missing key are left out.
+
+        Args:
+            by (list): Dimensions to group by
+            filters (dict): Dimension to required value, to an
+                inclusive (first, last) range of its levels, or to
+                `NOT_MISSING`, None meaning no filter. At most one range
+                per query; it is read from a cumulative table when not
+                counted by (see `span`)
+            labels (dict): Dimension to {level: label}. Levels sharing a
+                label are counted together, levels without one are left
+                out, and filters on the dimension give a label
+        Returns:
+            pd.DataFrame: The `by` columns and a 'count' column, sorted
+            by key. Labelled dimensions are categoricals of the labels,
+            in the order of their first level
+        '''
+        by = list(by)
+        labels = labels or {}
+        names, totals = self._totals(by, filters, labels)
+        found = np.flatnonzero(totals)
+
+        columns = {dimension: self._column(dimension, group, index, labels)
+                   for dimension, group, index in zip(by, names, np.unravel_index(found, totals.shape))}
+        columns['count'] = totals.ravel()[found]
+        return pd.DataFrame(columns)
+
+    def table(self, by, filters=None, labels=None, axes=None, missing=False):
+        '''
+        Counts like `count`, as a dense array instead of a frame.
+
+        Args:
+            by, filters, labels: See `count`
+            axes (dict): Dimension to the groups (levels, or labels) of
+                its axis, in order. Groups not listed are left out, and
+                listed groups without accidents count zero. Defaults to
+                every group of the dimension
+            missing (bool): Whether to count the accidents missing a
+                `by` dimension too, in the `MISSING` group of its axis
+        Returns:
+            tuple: The groups of each axis (lists) and the int64 counts,
+            with one axis per `by` dimension
+        '''
+        by = list(by)
+        axes = axes or {}
+        names, totals = self._totals(by, filters, labels, missing)
+        for axis, dimension in enumerate(by):
+            if dimension not in axes:
+                continue
+            positions = {name: index for index, name in enumerate(names[axis])}
+            # Groups without accidents read the zero slice appended last
+            index = [positions.get(name, -1) for name in axes[dimension]]
+            padding = np.zeros(totals.shape[:axis] + (1,) + totals.shape[axis + 1:], dtype=totals.dtype)
+            totals = np.take(np.concatenate([totals, padding], axis=axis), index, axis=axis)
+            names[axis] = list(axes[dimension])
+        return names, totals
+
+
+@st.cache_resource(max_entries=1)
+def _cube(version):
+    return Cube(load_dataset(version))
+
+
+def load_cube(version=None):
+    '''
+    Args:
+        version (DataVersion): The version of the rerun, see
+            `data_version`; resolved again if not given
+    Returns:
+        Cube: The cube of the data version, shared by all sessions
+    '''
+    return _cube(version or data_version())
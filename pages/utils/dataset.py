@@ -0,0 +1,792 @@
+'''
+    Shared access to the accident dataset.
+
+    The data is loaded once per process and kept as a single canonical
+    table. It is read from the columnar artifact written by
+    `python -m pages.utils.ingest`, or parsed from the CSV when the
+    artifact is missing or was built from another version of the CSV.
+    Pages build their own derived columns on top of it with `derive`,
+    which references the canonical columns instead of copying the whole
+    table for every page.
+
+    The data is partitioned by year (AN): the artifact holds one Parquet
+    file per year, and the table keeps the rows of each year contiguous
+    (`load_partitions`), so that a new version reuses the rows of the
+    years it did not change.
+
+    Each partition comes with the monthly trend counts of its year
+    (`trend_counts`), so that trends over the years are read from a few
+    thousand counts instead of the rows. The ingest also stores the
+    figures of a few charts, prerendered from the whole table (see
+    prerender.py).
+
+    The five road-user flags of the CSV are packed into one bitfield
+    column, USER_TYPES (see `USER_TYPE_FLAGS`): one byte per accident
+    for all of them, counted with bit operations (see user_types.py).
+
+    The artifact is versioned by its manifest. Appending a new extract
+    (`python -m pages.utils.ingest --append`) rewrites only its year,
+    and the running app picks the new version up on the next rerun,
+    reading only that partition. Replacing the CSV is picked up the
+    same way, through its fingerprint; the appended years are kept
+    over it (see `appended_partitions`). The dataset and page caches are
+    keyed on `data_version()` so that they follow: a page resolves it
+    once per rerun and passes it to every loader, so that a rerun never
+    mixes two versions, and the loaders read the manifest it was
+    resolved with rather than the one on disk.
+
+    Every column is backed by read-only buffers: the same arrays are
+    served by reference to all sessions and reruns, so an in-place
+    assignment raises instead of silently changing the data of others.
+'''
+import collections
+import json
+import logging
+import os
+import threading
+import zlib
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from pages.utils.aggregate import count_codes, encode
+
+DATA_PATH = 'assets/data_fusionnee.csv'
+# Directory of the year partitions and their manifest
+ARTIFACT_PATH = 'assets/data_fusionnee'
+MANIFEST_NAME = 'manifest.json'
+
+# Bumped whenever `normalize` or the artifact layout changes, so that older
+# artifacts are stale
+FORMAT_VERSION = 7
+
+GRAVITE_LEVELS = [
+    'Mortel ou grave',
+    'Léger',
+    'Dommages matériels seulement',
+    'Dommages matériels inférieurs au seuil de rapportage'
+]
+HOUR_RANGES = [
+    '00:00:00-03:59:00', '04:00:00-07:59:00',
+    '08:00:00-11:59:00', '12:00:00-15:59:00',
+    '16:00:00-19:59:00', '20:00:00-23:59:00'
+]
+REGION_LABELS = [
+    'Bas-Saint-Laurent (01)', 'Saguenay/-Lac-Saint-Jean (02)', 'Capitale-Nationale (03)',
+    'Mauricie (04)', 'Estrie (05)', 'Montréal (06)', 'Outaouais (07)',
+    'Abitibi-Témiscamingue (08)', 'Côte-Nord (09)', 'Nord-du-Québec (10)',
+    'Gaspésie/-Îles-de-la-Madeleine (11)', 'Chaudière-Appalaches (12)', 'Laval (13)',
+    'Lanaudière (14)', 'Laurentides (15)', 'Montérégie (16)', 'Centre-du-Québec (17)'
+]
+FLAG_LEVELS = ['N', 'O']
+
+# Explicit schema of the normalized table. Coded columns are small nullable
+# integers and labelled ones are categoricals with a fixed set of levels, so
+# every extract gets the same codes. Columns left out (NO_SEQ_COLL, the
+# collision id) are dropped.
+SCHEMA = {
+    'AN': 'Int16',
+    'MS_ACCDN': 'Int8',
+    'HR_ACCDN': pd.CategoricalDtype(HOUR_RANGES, ordered=True),
+    'JR_SEMN_ACCDN': pd.CategoricalDtype(['SEM', 'FDS']),
+    'GRAVITE': pd.CategoricalDtype(GRAVITE_LEVELS),
+    'NB_VICTIMES_TOTAL': 'Int8',
+    'NB_VEH_IMPLIQUES_ACCDN': 'Int8',
+    'REG_ADM': pd.CategoricalDtype(REGION_LABELS),
+    'VITESSE_AUTOR': pd.CategoricalDtype(['<50', '50', '60', '70', '80', '90', '100'], ordered=True),
+    'CD_GENRE_ACCDN': pd.CategoricalDtype(['véhicule', 'objet fixe', 'sans collision', 'animal',
+                                           'piéton', 'cycliste', 'autre']),
+    'CD_ETAT_SURFC': 'Int8',
+    'CD_ECLRM': 'Int8',
+    'CD_ENVRN_ACCDN': 'Int8',
+    'CD_CATEG_ROUTE': 'Int8',
+    'CD_ASPCT_ROUTE': pd.CategoricalDtype(['Droit', 'Courbe']),
+    'CD_LOCLN_ACCDN': 'Int8',
+    'CD_CONFG_ROUTE': 'Int8',
+    'CD_ZON_TRAVX_ROUTR': pd.CategoricalDtype(['O']),
+    'CD_COND_METEO': 'Int8',
+    'IND_AUTO_CAMION_LEGER': pd.CategoricalDtype(FLAG_LEVELS),
+    'IND_VEH_LOURD': pd.CategoricalDtype(FLAG_LEVELS),
+    'IND_MOTO_CYCLO': pd.CategoricalDtype(FLAG_LEVELS),
+    'IND_VELO': pd.CategoricalDtype(FLAG_LEVELS),
+    'IND_PIETON': pd.CategoricalDtype(FLAG_LEVELS)
+}
+
+DAY_NIGHT_LEVELS = ['Day', 'Night']
+QUARTER_DAY_LEVELS = ['Night (0-5h)', 'Morning (6-11h)', 'Afternoon (12-17h)', 'Evening (18-23h)']
+SEASON_LEVELS = ['Winter', 'Spring', 'Summer', 'Autumn']
+
+# Columns computed by `normalize` from the source ones, so that pages read
+# them instead of deriving them row by row:
+# - DAY_NIGHT: Day from 6h to 20h, from the start of HR_ACCDN
+# - QUARTER_DAY: quarter of the day of the start of HR_ACCDN
+# - SEASON: season of MS_ACCDN, January to March being Winter
+# - SEVERE_FLAG: 'O' for fatal or serious accidents (GRAVITE)
+DERIVED_SCHEMA = {
+    'DAY_NIGHT': pd.CategoricalDtype(DAY_NIGHT_LEVELS),
+    'QUARTER_DAY': pd.CategoricalDtype(QUARTER_DAY_LEVELS, ordered=True),
+    'SEASON': pd.CategoricalDtype(SEASON_LEVELS),
+    'SEVERE_FLAG': pd.CategoricalDtype(FLAG_LEVELS)
+}
+
+# Road-user flags of the CSV, packed by `normalize` into the uint8
+# USER_TYPES column: bit i is set when USER_TYPE_FLAGS[i] is 'O'. The flags
+# themselves are not kept.
+USER_TYPE_FLAGS = ['IND_AUTO_CAMION_LEGER', 'IND_VEH_LOURD', 'IND_MOTO_CYCLO', 'IND_VELO', 'IND_PIETON']
+
+# Filter dimensions of the trend counts, see `trend_counts`
+TREND_DIMENSIONS = ['CD_COND_METEO', 'CD_ETAT_SURFC', 'CD_ENVRN_ACCDN', 'CD_ASPCT_ROUTE', 'CD_ZON_TRAVX_ROUTR']
+
+# Version of the data served, see `data_version`
+DataVersion = collections.namedtuple('DataVersion', ['artifact', 'source', 'manifest'])
+
+logger = logging.getLogger(__name__)
+
+
+def clean_columns(df):
+    '''
+    Strips the tabs and quotes polluting some headers of the CSV
+    (e.g. '\\t\\t\\t"REG_ADM"' becomes 'REG_ADM').
+
+    Args:
+        df (pd.DataFrame): Freshly parsed data
+    Returns:
+        pd.DataFrame: The same frame with clean column names
+    '''
+    df.columns = df.columns.str.strip().str.replace('"', '').str.replace('\t', '')
+    return df
+
+
+def _categorical(column, dtype):
+    '''
+    Converts a column to the categorical `dtype`, ignoring the padding
+    spaces of the export. Codes are remapped per distinct label, never
+    per row.
+
+    Raises:
+        ValueError: If the column holds a label the schema does not know
+    '''
+    values = column.astype('category')
+    labels = values.cat.categories.astype(str).str.strip()
+    unknown = sorted(set(labels) - set(dtype.categories))
+    if unknown:
+        raise ValueError(f'Unexpected values in {column.name}: {unknown}')
+    # Missing values have code -1, which picks the appended -1
+    codes = np.append(dtype.categories.get_indexer(labels), -1)[values.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, dtype=dtype), index=column.index, name=column.name)
+
+
+def _recode(codes, levels, dtype):
+    '''
+    Builds a categorical column of `dtype` from the codes of a source
+    column, given the level of each source code (`levels`, None for no
+    level). The levels are looked up once per code, then the rows are
+    mapped with a single take. Missing sources (code -1) stay missing.
+    '''
+    lookup = np.append(dtype.categories.get_indexer(levels), -1)
+    return pd.Categorical.from_codes(lookup[codes], dtype=dtype)
+
+
+def derived_columns(columns):
+    '''
+    Computes the columns of `DERIVED_SCHEMA`.
+
+    Args:
+        columns (dict): The typed source columns
+    Returns:
+        dict: Column name to derived categorical
+    '''
+    start_hours = [int(hours[:2]) for hours in HOUR_RANGES]
+    hour_codes = columns['HR_ACCDN'].cat.codes.to_numpy()
+    months = columns['MS_ACCDN'].to_numpy(dtype='int64', na_value=0)
+    severity_codes = columns['GRAVITE'].cat.codes.to_numpy()
+    return {
+        'DAY_NIGHT': _recode(hour_codes, ['Day' if 6 <= hour < 20 else 'Night' for hour in start_hours],
+                             DERIVED_SCHEMA['DAY_NIGHT']),
+        'QUARTER_DAY': _recode(hour_codes, [QUARTER_DAY_LEVELS[min(hour // 6, 3)] for hour in start_hours],
+                               DERIVED_SCHEMA['QUARTER_DAY']),
+        # Month 0 stands for a missing month
+        'SEASON': _recode(months, [None] + [SEASON_LEVELS[min((month - 1) // 3, 3)] for month in range(1, 13)],
+                          DERIVED_SCHEMA['SEASON']),
+        # FLAG_LEVELS codes: 0 is 'N', 1 is 'O'. Accidents without severity
+        # are not severe.
+        'SEVERE_FLAG': pd.Categorical.from_codes((severity_codes == GRAVITE_LEVELS.index('Mortel ou grave')).astype('int8'),
+                                                 dtype=DERIVED_SCHEMA['SEVERE_FLAG'])
+    }
+
+
+def pack_user_types(columns):
+    '''
+    Packs the road-user flags into one bitfield per row, see
+    `USER_TYPE_FLAGS`. Missing flags count as 'N'.
+
+    Args:
+        columns (dict): The typed source columns
+    Returns:
+        np.ndarray: The uint8 bitfield of each row
+    '''
+    bits = np.zeros(len(columns[USER_TYPE_FLAGS[0]]), dtype=np.uint8)
+    for bit, name in enumerate(USER_TYPE_FLAGS):
+        bits |= (columns[name].cat.codes.to_numpy() == FLAG_LEVELS.index('O')).view(np.uint8) << bit
+    return bits
+
+
+def trend_counts(df):
+    '''
+    Counts the accidents per year, month and severity, overall and per
+    value of each of `TREND_DIMENSIONS` (grouping sets): each row sets
+    at most one of them, and rows setting none count every accident.
+    Accidents missing the year or the severity are left out; those
+    missing the month count in month 0.
+
+    Args:
+        df (pd.DataFrame): Normalized data
+    Returns:
+        pd.DataFrame: AN, MS_ACCDN, GRAVITE, `TREND_DIMENSIONS` and
+        'count', typed as in `SCHEMA`
+    '''
+    months = pd.Series(df['MS_ACCDN'].to_numpy(dtype='int64', na_value=0))
+    keys = [encode(df['AN']), encode(months, range(13)), encode(df['GRAVITE'])]
+    frames = []
+    for dimension in [None] + TREND_DIMENSIONS:
+        encoded = keys + ([encode(df[dimension])] if dimension else [])
+        counts = count_codes([codes for _, codes in encoded], [len(levels) for levels, _ in encoded])
+        cells = np.flatnonzero(counts)
+        columns = {name: levels[index] for name, (levels, _), index
+                   in zip(['AN', 'MS_ACCDN', 'GRAVITE', dimension], encoded, np.unravel_index(cells, counts.shape))}
+        columns['count'] = counts.ravel()[cells]
+        frames.append(pd.DataFrame(columns))
+    trends = pd.concat(frames, ignore_index=True)
+    trends['MS_ACCDN'] = trends['MS_ACCDN'].where(trends['MS_ACCDN'] > 0)
+    return trends.reindex(columns=['AN', 'MS_ACCDN', 'GRAVITE'] + TREND_DIMENSIONS + ['count']).astype(
+        {name: SCHEMA[name] for name in ['AN', 'MS_ACCDN', 'GRAVITE'] + TREND_DIMENSIONS})
+
+
+def normalize(df):
+    '''
+    Applies the fixes every extract of the CSV needs: clean headers,
+    labels without the padding spaces of the export, and the compact
+    types of `SCHEMA`. The columns of `DERIVED_SCHEMA` are added, and
+    the road-user flags replaced by their USER_TYPES bitfield.
+
+    Args:
+        df (pd.DataFrame): Freshly parsed data
+    Returns:
+        pd.DataFrame: The normalized frame, with the columns of `SCHEMA`
+        but the `USER_TYPE_FLAGS`, those of `DERIVED_SCHEMA` and
+        USER_TYPES
+    Raises:
+        ValueError: If a column is missing or holds unexpected values
+    '''
+    df = clean_columns(df)
+    missing = [name for name in SCHEMA if name not in df.columns]
+    if missing:
+        raise ValueError(f'Missing columns: {missing}')
+    columns = {}
+    for name, dtype in SCHEMA.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            columns[name] = _categorical(df[name], dtype)
+        else:
+            columns[name] = df[name].astype(dtype)
+    columns.update(derived_columns(columns))
+    columns['USER_TYPES'] = pack_user_types(columns)
+    for name in USER_TYPE_FLAGS:
+        del columns[name]
+    return pd.DataFrame(columns)
+
+
+def file_digest(path):
+    '''
+    Hashes the content of a file by chunks with CRC32: several times
+    faster than a cryptographic hash, and enough to tell two versions
+    of the data apart.
+    '''
+    crc = 0
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(1 << 20), b''):
+            crc = zlib.crc32(chunk, crc)
+    return f'{crc:08x}'
+
+
+# Path to ((size, mtime), fingerprint) of the last state seen
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def fingerprint(path=DATA_PATH):
+    '''
+    Identifies the content of a file. Its size and modification time
+    are read on every call, and its content is only hashed again when
+    they change. The modification time is not part of the result:
+    deployments rewrite it without changing the data.
+
+    Args:
+        path (str): The file to identify
+    Returns:
+        dict: Size and content hash of the file, or None if it does
+        not exist
+    '''
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    state = (stat.st_size, stat.st_mtime_ns)
+    with _fingerprints_lock:
+        seen, result = _fingerprints.get(path, (None, None))
+        if seen != state:
+            result = {'size': stat.st_size, 'digest': file_digest(path)}
+            _fingerprints[path] = (state, result)
+    return result
+
+
+def source_signature(path=DATA_PATH):
+    '''
+    Identifies the CSV an artifact is built from, and how it was built.
+
+    Args:
+        path (str): Path to the source CSV
+    Returns:
+        dict: Format version, size and content hash of the CSV
+    '''
+    return {'format': FORMAT_VERSION, **fingerprint(path)}
+
+
+def read_csv(path=DATA_PATH):
+    '''
+    Parses and normalizes the source CSV. Only the columns of `SCHEMA`
+    are parsed, labels directly as categoricals.
+    '''
+    names = clean_columns(pd.read_csv(path, nrows=0)).columns
+    dtypes = {name: 'category' if isinstance(dtype, pd.CategoricalDtype) else 'float32'
+              for name, dtype in SCHEMA.items()}
+    return normalize(pd.read_csv(path, header=0, names=names, usecols=list(SCHEMA), dtype=dtypes))
+
+
+def sort_years(df):
+    '''
+    Orders the rows by year, keeping the order of the extract within a
+    year. The CSV is exported year by year, so this usually copies
+    nothing.
+    '''
+    if df['AN'].is_monotonic_increasing:
+        return df
+    return df.sort_values('AN', kind='stable', ignore_index=True)
+
+
+def partition_path(path, entry):
+    '''
+    Path of the Parquet file of a partition, from its manifest entry.
+    '''
+    return os.path.join(path, entry['file'])
+
+
+def read_manifest(path=ARTIFACT_PATH):
+    '''
+    Returns:
+        dict: The manifest of the artifact at `path`, or None if there
+        is no artifact
+    '''
+    try:
+        with open(os.path.join(path, MANIFEST_NAME)) as manifest:
+            return json.load(manifest)
+    except FileNotFoundError:
+        return None
+
+
+def _write_partitions(df, path, version):
+    '''
+    Writes one zstd-compressed Parquet file per year of `df`,
+    categoricals dictionary encoded, and one of its trend counts (see
+    `trend_counts`). File names carry the version, so
+    the files a published manifest points to are never overwritten.
+
+    Returns:
+        dict: Year to the manifest entry of its new partition
+    '''
+    df = sort_years(df)
+    os.makedirs(path, exist_ok=True)
+    partitions = {}
+    for year, rows in year_bounds(df).items():
+        entry = {'file': f'AN={year}.v{version}.parquet', 'rows': rows.stop - rows.start, 'version': version,
+                 'trends': f'AN={year}.v{version}.trends.parquet'}
+        table = pa.Table.from_pandas(df.iloc[rows], preserve_index=False)
+        pq.write_table(table, partition_path(path, entry), compression='zstd', use_dictionary=True)
+        trends = pa.Table.from_pandas(trend_counts(df.iloc[rows]), preserve_index=False)
+        pq.write_table(trends, os.path.join(path, entry['trends']), compression='zstd')
+        partitions[str(year)] = entry
+    return partitions
+
+
+def _read_partitions(path, partitions):
+    '''
+    Returns:
+        pd.DataFrame: The rows of the `partitions` manifest entries, in
+        year order
+    '''
+    tables = [pq.read_table(partition_path(path, entry))
+              for _, entry in sorted((int(year), entry) for year, entry in partitions.items())]
+    return pa.concat_tables(tables).to_pandas()
+
+
+def _publish(manifest, path):
+    '''
+    Replaces the manifest in one rename, so that readers never see a
+    half-written artifact, then removes the partition and figure files
+    it no longer lists.
+    '''
+    staging = os.path.join(path, MANIFEST_NAME + '.tmp')
+    with open(staging, 'w') as output:
+        json.dump(manifest, output, indent=2)
+    os.replace(staging, os.path.join(path, MANIFEST_NAME))
+    listed = {name for entry in manifest['partitions'].values() for name in (entry['file'], entry['trends'])}
+    listed.add(manifest.get('figures'))
+    for name in os.listdir(path):
+        if name.endswith(('.parquet', '.figures.json')) and name not in listed:
+            os.remove(os.path.join(path, name))
+
+
+def appended_partitions(manifest, years):
+    '''
+    Finds the partitions added by `append_artifact` for years missing
+    from a table, e.g. the CSV, so that they outlive it. Partitions of
+    another `FORMAT_VERSION` are not kept.
+
+    Args:
+        manifest (dict): Manifest of the artifact, or None
+        years (iterable): Years of the table
+    Returns:
+        dict: Year to the manifest entry of each such partition
+    '''
+    if manifest is None or manifest['source'].get('format') != FORMAT_VERSION:
+        return {}
+    years = {str(year) for year in years}
+    appended = {str(year) for entry in manifest['appended'] for year in entry['years']}
+    return {year: entry for year, entry in manifest['partitions'].items() if year in appended - years}
+
+
+def write_artifact(df, path=ARTIFACT_PATH, source=DATA_PATH, render=None, keep_appended=True):
+    '''
+    Writes the normalized table as one Parquet file per year, with a
+    manifest listing the partitions and the signature of the source
+    CSV. Every write gets a new manifest version.
+
+    Years appended to the previous artifact that `df` does not hold are
+    kept (see `appended_partitions`): the CSV is not expected to hold
+    the extracts appended since it was exported.
+
+    Args:
+        df (pd.DataFrame): Normalized data, as returned by `read_csv`
+        path (str): Directory to write the artifact to
+        source (str): The CSV the data was read from
+        render (callable): Writes the prerendered figures of the table
+            to `path`, see `prerender.render_figures`. Without it, the
+            artifact has none
+        keep_appended (bool): Whether to keep the appended years, or
+            drop them with the rest of the previous artifact
+    Returns:
+        int: The version of the new artifact
+    '''
+    previous = read_manifest(path)
+    version = previous.get('version', 0) + 1 if previous else 1
+    partitions = _write_partitions(df, path, version)
+    kept = appended_partitions(previous, partitions) if keep_appended else {}
+    partitions.update(kept)
+    # The appends of the kept years, restricted to them
+    appended = [dict(entry, years=[year for year in entry['years'] if str(year) in kept])
+                for entry in previous['appended']] if kept else []
+    manifest = {
+        'version': version,
+        'source': source_signature(source),
+        'partitions': partitions,
+        'appended': [entry for entry in appended if entry['years']],
+        'figures': None
+    }
+    if render:
+        manifest['figures'] = render(_read_partitions(path, partitions) if kept else df, path, version)
+    _publish(manifest, path)
+    return version
+
+
+def append_artifact(df, path=ARTIFACT_PATH, source=None, render=None):
+    '''
+    Adds a new extract (typically one year) to an existing artifact.
+    Only the partitions of the years it holds are written; a year that
+    is already there is replaced by the new extract. The other
+    partitions are left untouched.
+
+    Args:
+        df (pd.DataFrame): Normalized data of the new extract
+        path (str): Directory of the artifact
+        source (str): The CSV of the extract, recorded in the manifest
+        render (callable): As for `write_artifact`, rendering the
+            figures again from every partition. It reads the whole
+            table, so it is left to the caller; without it, the figures
+            of the previous version are dropped and the pages build them
+            on first view
+    Returns:
+        int: The version of the updated artifact
+    Raises:
+        FileNotFoundError: If there is no artifact to append to
+    '''
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f'No artifact in {path}: build it first with `python -m pages.utils.ingest`')
+    version = manifest['version'] + 1
+    partitions = _write_partitions(df, path, version)
+    manifest['version'] = version
+    manifest['partitions'].update(partitions)
+    manifest['appended'].append({
+        'version': version,
+        'years': [int(year) for year in partitions],
+        'source': source_signature(source) if source else None
+    })
+    # The figures of the previous version count the replaced years
+    manifest['figures'] = render(_read_partitions(path, manifest['partitions']), path, version) if render else None
+    _publish(manifest, path)
+    return version
+
+
+def is_current(manifest, source=DATA_PATH):
+    '''
+    Tells whether an artifact was built from the CSV at `source`. When
+    the CSV is absent (artifact-only deployment), the artifact is used
+    as is.
+    '''
+    return not os.path.exists(source) or manifest['source'] == source_signature(source)
+
+
+def read_artifact(path=ARTIFACT_PATH, source=DATA_PATH, years=None):
+    '''
+    Reads the columnar artifact if it is up to date with the CSV. Only
+    the files of the requested years are opened.
+
+    Args:
+        path (str): Directory of the artifact
+        source (str): Path to the source CSV
+        years (list): Years to read, all of them by default
+    Returns:
+        pd.DataFrame: The normalized data, sorted by year, or None if
+        the artifact is missing or stale
+    '''
+    manifest = read_manifest(path)
+    if manifest is None or not is_current(manifest, source):
+        return None
+    partitions = {year: entry for year, entry in manifest['partitions'].items() if years is None or int(year) in years}
+    if not partitions:
+        return None
+    return _read_partitions(path, partitions)
+
+
+def _readonly(array):
+    '''
+    Returns a non-writeable view of a numpy buffer.
+    '''
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+def _freeze(df):
+    '''
+    Rebuilds `df` on top of read-only views of its buffers, one block
+    per column so that no write can reach the shared arrays. No data
+    is copied.
+
+    Args:
+        df (pd.DataFrame): The frame to share
+    Returns:
+        pd.DataFrame: The read-only frame
+    '''
+    columns = {}
+    for name, column in df.items():
+        values = column.array
+        if isinstance(values, pd.Categorical):
+            values = pd.Categorical.from_codes(_readonly(values.codes), dtype=values.dtype)
+        elif isinstance(values, pd.api.extensions.ExtensionArray) and hasattr(values, '_mask'):
+            # Nullable integers and booleans: values and mask buffers
+            values = type(values)(_readonly(values._data), _readonly(values._mask))
+        elif isinstance(values, pd.arrays.NumpyExtensionArray):
+            values = _readonly(column.to_numpy())
+        # Arrow-backed arrays (strings) are immutable already
+        columns[name] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+# The last table read from the artifact and its manifest: partitions that
+# did not change are reused from it when a new version is loaded.
+_last_load = {}
+
+
+def _assemble(manifest, path=ARTIFACT_PATH):
+    '''
+    Builds the table of `manifest`, reading only the partitions that
+    are not already loaded.
+    '''
+    previous = _last_load.get('manifest')
+    if previous is not None and previous['source'] != manifest['source']:
+        previous = None
+    bounds = year_bounds(_last_load['table']) if previous else {}
+    parts = []
+    for year, entry in sorted((int(year), entry) for year, entry in manifest['partitions'].items()):
+        if previous and previous['partitions'].get(str(year)) == entry:
+            parts.append(_last_load['table'].iloc[bounds[year]])
+        else:
+            parts.append(pq.read_table(partition_path(path, entry)).to_pandas())
+    df = pd.concat(parts, ignore_index=True)
+    _last_load.update(manifest=manifest, table=df)
+    return df
+
+
+def data_version(path=ARTIFACT_PATH, source=DATA_PATH):
+    '''
+    Version of the data served: the manifest version of the artifact,
+    bumped by every build and append, and the fingerprint of the CSV.
+    Replacing either changes it. The dataset and every page cache built
+    on it are keyed on this version and keep a single entry, so a data
+    swap evicts them and is loaded once per process.
+
+    Resolve it once per rerun and pass it to the loaders: the manifest
+    it holds is the one they read, even if an ingest has replaced it
+    since.
+
+    Returns:
+        DataVersion: Manifest version (None without artifact), size and
+        content hash of the CSV (None without CSV), and the manifest
+    '''
+    manifest = read_manifest(path)
+    return DataVersion(manifest.get('version') if manifest else None, fingerprint(source), manifest)
+
+
+def version_manifest(version):
+    '''
+    Returns:
+        dict: The manifest of `version` if its artifact was built from
+        its CSV (or it has no CSV), None if it is missing or stale
+    '''
+    manifest = version.manifest
+    if manifest is None or version.source is None:
+        return manifest
+    return manifest if manifest['source'] == {'format': FORMAT_VERSION, **version.source} else None
+
+
+@st.cache_resource(show_spinner='Loading accident data...', max_entries=1)
+def _load_version(version):
+    manifest = version_manifest(version)
+    if manifest is not None:
+        df = _assemble(manifest)
+    else:
+        logger.warning('%s is missing or stale, parsing %s; run `python -m pages.utils.ingest` to rebuild it',
+                       ARTIFACT_PATH, DATA_PATH)
+        df = read_csv()
+        # The years appended to the artifact are not in the CSV
+        appended = appended_partitions(version.manifest, df['AN'].dropna().unique().tolist())
+        if appended:
+            df = pd.concat([df, _read_partitions(ARTIFACT_PATH, appended)], ignore_index=True)
+        df = sort_years(df)
+    return _freeze(df)
+
+
+def load_dataset(version=None):
+    '''
+    Loads the accident data once per version of the artifact. The
+    returned frame is shared by reference with every page and every
+    session; its columns are read-only, use `derive` to add columns.
+
+    After an append, the next call loads the new version, reading only
+    the partitions that changed.
+
+    Args:
+        version (DataVersion): The version of the rerun, see
+            `data_version`; resolved again if not given
+    Returns:
+        pd.DataFrame: The canonical accident table
+    '''
+    return _load_version(version or data_version())
+
+
+@st.cache_resource(max_entries=1)
+def _trend_counts(version):
+    manifest = version_manifest(version)
+    if manifest is not None:
+        tables = [pq.read_table(os.path.join(ARTIFACT_PATH, entry['trends']))
+                  for _, entry in sorted(manifest['partitions'].items())]
+        return pa.concat_tables(tables).to_pandas()
+    return trend_counts(_load_version(version))
+
+
+def load_trend_counts(version=None):
+    '''
+    Loads the trend counts of every year (see `trend_counts`), from the
+    artifact, once per version (see `load_dataset`). Without an up to
+    date artifact they are counted from the loaded table. The frame is
+    shared and must not be modified.
+    '''
+    return _trend_counts(version or data_version())
+
+
+def year_bounds(df):
+    '''
+    Finds the row range of each year in a table sorted by year.
+
+    Args:
+        df (pd.DataFrame): Data sorted by AN
+    Returns:
+        dict: Year to the slice of its rows
+    '''
+    years = df['AN'].dropna().to_numpy(dtype='int64')
+    values, starts = np.unique(years, return_index=True)
+    stops = np.append(starts[1:], len(years))
+    return {int(year): slice(int(start), int(stop)) for year, start, stop in zip(values, starts, stops)}
+
+
+@st.cache_resource(max_entries=1)
+def _partitions(version):
+    return year_bounds(_load_version(version))
+
+
+def load_partitions(version=None):
+    '''
+    Args:
+        version (DataVersion): See `load_dataset`
+    Returns:
+        dict: Year to the slice of its rows in the canonical table, in
+        year order
+    '''
+    return _partitions(version or data_version())
+
+
+def decode(column, labels):
+    '''
+    Labels a coded column as a categorical, with one category per code
+    of `labels`, in order. Only the categories are relabelled: the rows
+    keep one-byte codes. Codes without a label become missing.
+
+    Args:
+        column (pd.Series): Coded column, e.g. CD_COND_METEO
+        labels (dict): Code to label
+    Returns:
+        pd.Series: The labelled column
+    '''
+    values = pd.Categorical(column, categories=list(labels))
+    return pd.Series(values.rename_categories(list(labels.values())), index=column.index, name=column.name)
+
+
+def derive(base, columns):
+    '''
+    Builds a page view of `base` with extra or replaced columns.
+
+    The columns of `base` are referenced, not copied, so a view only
+    costs the memory of the columns it adds. The view is read-only too.
+
+    Args:
+        base (pd.DataFrame): The canonical table from `load_dataset`
+        columns (dict): Column name to Series (or array) of derived values
+    Returns:
+        pd.DataFrame: The page view
+    '''
+    data = {name: base[name] for name in base.columns}
+    data.update(columns)
+    return _freeze(pd.DataFrame(data, index=base.index, copy=False))
@@ -0,0 +1,92 @@
+'''
+    Facets: the values of filter columns found among the rows matching
+    the current filters, with their counts.
+
+    The counts are precomputed for every combination of the context
+    filters (e.g. year and severity, each possibly unset) from the
+    bitmap index, one popcount per (combination, value). The table of
+    each column is a co-occurrence table of its values with the context
+    values, so serving the options of a dropdown is a dictionary lookup.
+    A range of context values (e.g. of years) adds up the tables of the
+    values in the range.
+'''
+import itertools
+
+import numpy as np
+
+from pages.utils.bitmaps import popcount
+
+
+class Facets:
+    '''
+    Precomputed facet counts of indexed columns.
+
+    Args:
+        index (BitmapIndex): Index of the facet and context columns
+        columns (list): The facet columns
+        context (list): The filter columns the counts depend on
+    '''
+
+    def __init__(self, index, columns, context):
+        self.context = list(context)
+        # Values of each column, in category order
+        self._values = {column: list(index.bitmaps[column]) for column in [*columns, *self.context]}
+        self._totals = {}
+        self._counts = {column: {} for column in columns}
+        # Every combination of context values, None standing for no filter
+        choices = [self._values[column] + [None] for column in self.context]
+        for key in itertools.product(*choices):
+            selected = index.match(dict(zip(self.context, key)))
+            self._totals[key] = popcount(selected)
+            for column in columns:
+                counts = {}
+                for value, bitmap in index.bitmaps[column].items():
+                    count = popcount(np.bitwise_and(bitmap, selected))
+                    if count:
+                        counts[value] = count
+                self._counts[column][key] = counts
+
+    def _keys(self, filters, column=None):
+        '''
+        Returns:
+            list: The precomputed combinations the filters add up to.
+            A facet ignores the filter on its own column, and an
+            inclusive (first, last) range stands for its values
+        '''
+        choices = []
+        for name in self.context:
+            value = None if name == column else filters.get(name)
+            if isinstance(value, tuple):
+                choices.append([v for v in self._values[name] if value[0] <= v <= value[1]])
+            else:
+                choices.append([value])
+        return list(itertools.product(*choices))
+
+    def counts(self, column, filters):
+        '''
+        Args:
+            column (str): A facet column
+            filters (dict): Values, or ranges of values, of the context
+                columns, None meaning no filter. The filter on `column`
+                itself is ignored.
+        Returns:
+            dict: The values of `column` found among the matching rows,
+            in category order, to their number of rows. Not to be
+            modified.
+        '''
+        keys = self._keys(filters, column)
+        if len(keys) == 1:
+            return self._counts[column].get(keys[0], {})
+        summed = {}
+        for key in keys:
+            for value, count in self._counts[column].get(key, {}).items():
+                summed[value] = summed.get(value, 0) + count
+        return {value: summed[value] for value in self._values[column] if value in summed}
+
+    def total(self, filters, column=None):
+        '''
+        Returns:
+            int: The number of rows matching the context filters, but
+            the one on `column`
+        '''
+        return sum(self._totals.get(key, 0) for key in self._keys(filters, column))
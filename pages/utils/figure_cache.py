@@ -0,0 +1,104 @@
+'''
+    Server-side cache of finished figures, shared by all sessions.
+
+    A figure is keyed by its page, its chart and the parameters it is
+    drawn for (e.g. the selected season), within the current data
+    version. The first view of a key builds the figure; any later view
+    of the same key, by any user, gets it back without aggregating or
+    building anything. Figures prerendered at ingest are taken from the
+    artifact instead of being built (see prerender.py).
+
+    Entries are evicted least recently used first once their total size
+    passes the budget (`FIGURE_CACHE_BYTES` environment variable, 64 MB
+    by default). The size of a figure is the length of its JSON, i.e.
+    what is sent to the browser for it.
+
+    Figures are kept as objects rather than as their JSON: turning JSON
+    back into a figure validates every property again, which costs most
+    of a build. Cached figures are shared, so they must not be modified.
+'''
+import collections
+import os
+import threading
+
+import streamlit as st
+
+from pages.utils.dataset import data_version
+from pages.utils.prerender import prerendered_figure
+
+BUDGET_BYTES = int(os.environ.get('FIGURE_CACHE_BYTES', 64 << 20))
+
+
+class FigureCache:
+    '''
+    Least recently used figures, within a memory budget.
+
+    Args:
+        budget (int): Total size of the cached figures, in bytes
+    '''
+
+    def __init__(self, budget=BUDGET_BYTES):
+        self.budget = budget
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        # Key to (figure, size)
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, build):
+        '''
+        Returns the figure cached under `key`, building it with `build()`
+        on a miss. A figure larger than the whole budget is returned
+        without being cached; None (nothing to draw) is cached as well.
+        '''
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        # Built outside the lock: concurrent misses just build it twice
+        figure = build()
+        size = 0 if figure is None else len(figure.to_json())
+        if size > self.budget:
+            return figure
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (figure, size)
+                self.size += size
+            while self.size > self.budget:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+        return figure
+
+
+@st.cache_resource(max_entries=1)
+def _figure_cache(version):
+    # One cache per data version: a new version drops every figure
+    return FigureCache()
+
+
+def cached_figure(page, chart, params, build, version=None):
+    '''
+    Returns the figure of `chart` on `page` for `params`, prerendered or
+    built with `build()` on first use in the data version.
+
+    Args:
+        page (str): The page drawing the figure
+        chart (str): The chart on that page
+        params (tuple): Everything the figure depends on besides the
+            data, hashable (e.g. widget values)
+        build (callable): Builds the figure, aggregation included, or
+            returns None if there is nothing to draw
+        version (DataVersion): The version of the rerun, see
+            `data_version`; resolved again if not given
+    Returns:
+        go.Figure: The figure (or None), shared: not to be modified
+    '''
+    key = (page, chart, params)
+    version = version or data_version()
+    return _figure_cache(version).get(key, lambda: prerendered_figure(key, build, version))
@@ -0,0 +1,58 @@
+'''
+    Ingest of the accident CSV into the columnar artifact the app loads
+    at startup, with the prerendered figures of a few charts. Run it
+    again whenever the CSV is replaced: until then the app falls back to
+    parsing the CSV and building every figure.
+
+    A new yearly extract can instead be appended to the existing
+    artifact with --append: only the partitions of its years are
+    written, and running instances load the new version on their next
+    rerun without re-reading the other years. Prerendering the figures
+    again reads every year, so on append it only runs with --render;
+    otherwise the figures of the previous version are dropped.
+
+    The appended years are kept by the next full ingest when its CSV
+    does not hold them (and served with the CSV when it is replaced
+    before the ingest); --drop-appended drops them instead.
+
+    Usage (from the repository root):
+        python -m pages.utils.ingest [--source CSV] [--drop-appended] [--output DIRECTORY]
+        python -m pages.utils.ingest --append CSV [--render] [--output DIRECTORY]
+'''
+import argparse
+import os
+import time
+
+from pages.utils.dataset import ARTIFACT_PATH, DATA_PATH, append_artifact, read_csv, write_artifact
+from pages.utils.prerender import render_figures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the columnar accident dataset.')
+    parser.add_argument('--source', default=DATA_PATH, help='CSV extract to ingest')
+    parser.add_argument('--append', metavar='CSV', help='Add this extract to the existing artifact')
+    parser.add_argument('--drop-appended', action='store_true',
+                        help='Without --append, drop the appended years the CSV does not hold')
+    parser.add_argument('--render', action='store_true',
+                        help='With --append, prerender the figures again from every year')
+    parser.add_argument('--output', default=ARTIFACT_PATH, help='Directory to write the year partitions to')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.append:
+        df = read_csv(args.append)
+        version = append_artifact(df, args.output, source=args.append,
+                                  render=render_figures if args.render else None)
+        source = args.append
+    else:
+        df = read_csv(args.source)
+        version = write_artifact(df, args.output, source=args.source, render=render_figures,
+                                 keep_appended=not args.drop_appended)
+        source = args.source
+    size = sum(entry.stat().st_size for entry in os.scandir(args.output))
+    print(f'{len(df):,} rows from {source} written to {args.output} as version {version} '
+          f'({size / 2**20:.1f} MB) in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
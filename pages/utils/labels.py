@@ -0,0 +1,31 @@
+'''
+    English labels of the accident codes shared by several charts, so
+    that a level reads the same on every page.
+'''
+
+# Road surface states (CD_ETAT_SURFC) drawn by the charts, in chart order
+SURFACE_STATE_LABELS = ["Dry", "Wet", "Hydroplaning", "Sand/Gravel", "Melting snow",
+                        "Snow", "Compacted snow", "Icy", "Muddy", "Other"]
+SURFACE_STATE_CODES = [11, 12, 13, 14, 15, 16, 17, 18, 19, 99]
+
+# Severities (GRAVITE), from the most to the least severe, applied to the counts of the cube
+SEVERITY_LABELS = {
+    'Mortel ou grave': 'Severe',
+    'Léger': 'Minor',
+    'Dommages matériels seulement': 'Material Damage',
+    'Dommages matériels inférieurs au seuil de rapportage': 'Low Damage'
+}
+
+# Short French severities (GRAVITE), shown by the dashboard and the temporal and spatial page
+SEVERITY_SHORT_LABELS = {
+    'Dommages matériels seulement': 'Matériels',
+    'Dommages matériels inférieurs au seuil de rapportage': 'Mineurs',
+    'Léger': 'Léger',
+    'Mortel ou grave': 'Grave'
+}
+
+# Week types (JR_SEMN_ACCDN)
+WEEK_TYPE_LABELS = {
+    'SEM': 'Weekday',
+    'FDS': 'Weekend'
+}
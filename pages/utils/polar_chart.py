@@ -0,0 +1,222 @@
+'''
+    Polar charts of the accidents of a season per road surface state
+    and lighting, for one severity or all of them, and of every season
+    side by side. Kept here so that the ingest can prerender them (see
+    prerender.py).
+
+    Every chart is a slice of one dense table of counts per season,
+    severity, lighting and surface (`PolarCounts`), read from the cube
+    once per data version and shared by all sessions: changing the
+    season or the severity does not touch the accident rows.
+'''
+import plotly.graph_objects as go
+import streamlit as st
+from plotly.subplots import make_subplots
+
+from pages.utils.cube import load_cube
+from pages.utils.dataset import SEASON_LEVELS, data_version
+from pages.utils.labels import SEVERITY_LABELS, SURFACE_STATE_CODES, SURFACE_STATE_LABELS
+
+# Calculate theta values based on the number of surface states for even distribution
+THETA = [i * (360 / len(SURFACE_STATE_CODES)) for i in range(len(SURFACE_STATE_CODES))]
+
+LIGHTING_COLORS = {
+    1: "#FFD700",  # Gold
+    2: "#FFA500",  # Orange
+    3: "#1E90FF",  # Dodger Blue
+    4: "#2F4F4F"   # Dark Slate Gray
+}
+LIGHTING_LABELS = {
+    1: "Daylight and clear",
+    2: "Daylight and twilight",
+    3: "Night and lit road",
+    4: "Night and unlit road"
+}
+
+LIGHTING_CODES = list(LIGHTING_LABELS)
+
+# Severities of the counts, and the choices of the severity toggle
+SEVERITIES = list(SEVERITY_LABELS.values())
+ALL_SEVERITIES = 'All Severities'
+SEVERITY_CHOICES = SEVERITIES + [ALL_SEVERITIES]
+
+# Season choice drawing every season side by side
+ALL_SEASONS = 'All Seasons'
+
+
+class PolarCounts:
+    '''
+    Accident counts per season (`SEASON_LEVELS`), severity
+    (`SEVERITIES`), lighting (`LIGHTING_CODES`) and surface state, as one
+    dense table. The surfaces of the charts (`SURFACE_STATE_CODES`) come
+    first; the others only tell which lighting types have accidents.
+    Accidents missing one of these are left out.
+
+    Args:
+        cube (Cube): The cube of accident counts
+    '''
+
+    def __init__(self, cube):
+        surfaces = SURFACE_STATE_CODES + [code for code in cube.levels['CD_ETAT_SURFC']
+                                          if code not in SURFACE_STATE_CODES]
+        _, self.counts = cube.table(['SEASON', 'GRAVITE', 'CD_ECLRM', 'CD_ETAT_SURFC'],
+                                    labels={'GRAVITE': SEVERITY_LABELS},
+                                    axes={'SEASON': SEASON_LEVELS, 'GRAVITE': SEVERITIES,
+                                          'CD_ECLRM': LIGHTING_CODES, 'CD_ETAT_SURFC': surfaces})
+
+    def table(self, season, severity):
+        '''
+        Args:
+            season (str): One of `SEASON_LEVELS`
+            severity (str): One of `SEVERITY_CHOICES`
+        Returns:
+            np.ndarray: The accidents of the season and severity, per
+            lighting type (rows) and surface (columns)
+        '''
+        counts = self.counts[SEASON_LEVELS.index(season)]
+        if severity == ALL_SEVERITIES:
+            return counts.sum(axis=0)
+        return counts[SEVERITIES.index(severity)]
+
+
+@st.cache_resource(max_entries=1)
+def _polar_counts(version):
+    return PolarCounts(load_cube(version))
+
+
+def load_polar_counts(version=None):
+    '''
+    Args:
+        version (DataVersion): See `load_cube`
+    Returns:
+        PolarCounts: The polar chart counts of the data version, shared
+        by all sessions
+    '''
+    return _polar_counts(version or data_version())
+
+
+def _accidents(severity):
+    # "Severe Accidents", or "Accidents" for every severity
+    return "Accidents" if severity == ALL_SEVERITIES else f"{severity} Accidents"
+
+
+def _season_traces(table, season, severity):
+    '''
+    Returns:
+        list: One bar trace per lighting type, from the `PolarCounts.table`
+        of the season
+    '''
+    chart_counts = table[:, :len(SURFACE_STATE_CODES)]
+    accidents = "Accidents" if severity == ALL_SEVERITIES else f"{severity} accidents"
+    traces = []
+    for row, (lighting_code, lighting_name) in enumerate(LIGHTING_LABELS.items()):
+        if table[row].any(): # Check if this lighting type exists in the filtered data
+            # Hover text from a template: the surface label is the custom data of each bar
+            traces.append(go.Barpolar(
+                r=chart_counts[row].tolist(),
+                theta=THETA,
+                name=lighting_name,
+                marker_color=LIGHTING_COLORS.get(lighting_code, "#808080"), # Fallback color
+                customdata=SURFACE_STATE_LABELS,
+                hovertemplate=(f"Season: {season}<br>Surface: %{{customdata}}<br>Lighting: {lighting_name}<br>"
+                               f"{accidents}: %{{r}}<extra></extra>")
+            ))
+        else:
+            # If a lighting type has no data for the selected season/severity, add a dummy trace
+            # so it still appears in the legend but with no visible bars.
+            traces.append(go.Barpolar(
+                r=[0] * len(SURFACE_STATE_CODES),
+                theta=THETA,
+                name=lighting_name,
+                marker_color=LIGHTING_COLORS.get(lighting_code, "#808080"),
+                hovertemplate=f"No data for {lighting_name} in {season}<extra></extra>"
+            ))
+    return traces
+
+
+def _polar_axes(max_val):
+    return dict(
+        radialaxis=dict(visible=True, range=[0, max_val * 1.05]), # Adjust range based on max value
+        angularaxis=dict(
+            tickvals=THETA,
+            ticktext=SURFACE_STATE_LABELS,
+            rotation=90,
+            direction="clockwise",
+            linecolor="gray",
+            gridcolor="lightgray"
+        )
+    )
+
+
+def season_polar_chart(polar, season, severity='Severe'):
+    '''
+    Creates the polar chart of the accidents of a season and severity, per surface state
+    and lighting type. Returns None if the season has no accident of that severity.
+    '''
+    # Accidents of the season per lighting and surface, sliced from the shared counts
+    # (logic from Dash callback): rows are the lighting types, columns the surfaces
+    table = polar.table(season, severity)
+    if not table.any():
+        return None
+
+    # Create the polar chart
+    fig = go.Figure(data=_season_traces(table, season, severity))
+    fig.update_layout(
+        title=f"Polar Bar Chart – Number of {_accidents(severity)} ({season})",
+        polar=_polar_axes(table[:, :len(SURFACE_STATE_CODES)].max()),
+        template="plotly_white",
+        height=800, # Set a fixed height as per original Dash layout
+        width=900,  # Set a fixed width as per original Dash layout, adjust for responsiveness with use_container_width
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+    return fig
+
+
+def all_seasons_polar_chart(polar, severity='Severe'):
+    '''
+    Creates the polar charts of every season side by side (small multiples), for one
+    severity, on the same radial scale. Returns None if there is no accident of that severity.
+    '''
+    tables = [polar.table(season, severity) for season in SEASON_LEVELS]
+    if not any(table.any() for table in tables):
+        return None
+
+    fig = make_subplots(rows=2, cols=2, specs=[[{'type': 'polar'}] * 2] * 2, subplot_titles=SEASON_LEVELS,
+                        vertical_spacing=0.12)
+    for index, (season, table) in enumerate(zip(SEASON_LEVELS, tables)):
+        for trace in _season_traces(table, season, severity):
+            # One legend entry per lighting type, toggling it in every season
+            trace.update(legendgroup=trace.name, showlegend=index == 0)
+            fig.add_trace(trace, row=index // 2 + 1, col=index % 2 + 1)
+
+    fig.update_polars(**_polar_axes(max(table[:, :len(SURFACE_STATE_CODES)].max() for table in tables)))
+    fig.update_layout(
+        title=f"Polar Bar Chart – Number of {_accidents(severity)} by Season",
+        template="plotly_white",
+        height=1000,
+        width=900,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.04,
+            xanchor="right",
+            x=1
+        )
+    )
+    return fig
+
+
+def polar_chart(polar, season, severity='Severe'):
+    '''
+    Creates the polar chart of a season, or of every season for `ALL_SEASONS`, see
+    `season_polar_chart` and `all_seasons_polar_chart`.
+    '''
+    if season == ALL_SEASONS:
+        return all_seasons_polar_chart(polar, severity)
+    return season_polar_chart(polar, season, severity)
@@ -0,0 +1,119 @@
+'''
+    Figures prerendered at ingest.
+
+    A few charts only have a handful of states: the severe accidents
+    heatmap has one, the Sankey diagram three, the polar chart one per
+    season (or all of them) and severity, and the period and granularity
+    choices of the accident visualizations two or three. `render_figures`
+    builds every state of them when the artifact is written and stores
+    their JSON next to its partitions, listed in the manifest. On a miss,
+    the figure cache (see figure_cache.py) takes them from there instead
+    of computing them, so a cold view of these charts costs reading one
+    file per data version.
+
+    The figures are built by the functions the pages use, under the keys
+    the pages give the figure cache. `FIGURES_VERSION` is bumped whenever
+    one of these functions changes: figures of another version are
+    ignored, and built by the pages until the next ingest.
+'''
+import json
+import os
+
+import plotly.graph_objects as go
+import plotly.utils
+import streamlit as st
+
+from pages.utils.accident_charts import (GRANULARITIES, accident_severity_month_chart, accidents_by_user_type_chart,
+                                         generate_accident_severity_bar_chart_by_time,
+                                         generate_severe_accidents_heatmap_chart, user_type_pairs_chart)
+from pages.utils.cube import Cube
+from pages.utils.dataset import ARTIFACT_PATH, DAY_NIGHT_LEVELS, SEASON_LEVELS, data_version, version_manifest
+from pages.utils.polar_chart import ALL_SEASONS, SEVERITY_CHOICES, PolarCounts, polar_chart
+from pages.utils.sankey_chart import CHART_TYPES, create_sankey_chart
+
+FIGURES_VERSION = 4
+
+# (page, chart) of the figure cache to the function building the figure
+# from the data, its cube and the chart parameters, and every value of
+# the parameters
+PRERENDERED = {
+    ('accident_visualizations', 'user type'): (
+        lambda df, cube, period: accidents_by_user_type_chart(df, period),
+        [(period,) for period in DAY_NIGHT_LEVELS]),
+    ('accident_visualizations', 'user type pairs'): (
+        lambda df, cube, period: user_type_pairs_chart(df, period),
+        [(period,) for period in DAY_NIGHT_LEVELS]),
+    ('accident_visualizations', 'severity by month'): (
+        lambda df, cube, period: accident_severity_month_chart(cube, period),
+        [(period,) for period in DAY_NIGHT_LEVELS]),
+    ('accident_visualizations', 'severe heatmap'): (
+        lambda df, cube: generate_severe_accidents_heatmap_chart(cube),
+        [()]),
+    ('accident_visualizations', 'severity by time'): (
+        lambda df, cube, granularity: generate_accident_severity_bar_chart_by_time(cube, granularity),
+        [(granularity,) for granularity in GRANULARITIES]),
+    ('road_severity', 'sankey'): (
+        lambda df, cube, chart_type: create_sankey_chart(cube, chart_type),
+        [(chart_type,) for chart_type in CHART_TYPES]),
+    ('polar_grave_surface', 'polar'): (
+        lambda df, cube, season, severity: polar_chart(PolarCounts(cube), season, severity),
+        [(season, severity) for season in SEASON_LEVELS + [ALL_SEASONS] for severity in SEVERITY_CHOICES])
+}
+
+
+def render_figures(df, path, version):
+    '''
+    Builds every state of the `PRERENDERED` figures and writes them to
+    one JSON file of the artifact.
+
+    Args:
+        df (pd.DataFrame): The normalized data of the whole artifact
+        path (str): Directory of the artifact
+        version (int): The version of the artifact being written
+    Returns:
+        str: The name of the file, in `path`
+    '''
+    cube = Cube(df)
+    figures = []
+    for (page, chart), (build, choices) in PRERENDERED.items():
+        for params in choices:
+            figure = build(df, cube, *params)
+            figures.append({'page': page, 'chart': chart, 'params': list(params),
+                            'figure': None if figure is None else figure.to_plotly_json()})
+    name = f'v{version}.figures.json'
+    with open(os.path.join(path, name), 'w') as output:
+        json.dump({'version': FIGURES_VERSION, 'figures': figures}, output, cls=plotly.utils.PlotlyJSONEncoder)
+    return name
+
+
+@st.cache_resource(max_entries=1)
+def _figures(version):
+    manifest = version_manifest(version)
+    if manifest is None or not manifest.get('figures'):
+        return {}
+    with open(os.path.join(ARTIFACT_PATH, manifest['figures'])) as source:
+        stored = json.load(source)
+    if stored['version'] != FIGURES_VERSION:
+        return {}
+    return {(entry['page'], entry['chart'], tuple(entry['params'])): entry['figure'] for entry in stored['figures']}
+
+
+def prerendered_figure(key, build, version=None):
+    '''
+    Returns the figure prerendered under `key`, or builds it with
+    `build()` if the artifact of `version` has none.
+
+    Args:
+        key (tuple): Page, chart and parameters, as for `cached_figure`
+        build (callable): Builds the figure
+        version (DataVersion): See `cached_figure`
+    Returns:
+        go.Figure: The figure, or None if there is nothing to draw
+    '''
+    figures = _figures(version or data_version())
+    if key not in figures:
+        return build()
+    figure = figures[key]
+    # Validated when it was rendered: checking every property again would
+    # cost about as much as building it
+    return None if figure is None else go.Figure(figure, _validate=False)
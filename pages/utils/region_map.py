@@ -0,0 +1,59 @@
+'''
+    Accident maps drawn as one bubble per (region, severity), placed on
+    the region centroids.
+
+    Accidents are only located by region, so one marker per accident
+    would pile up on the 17 centroids. Bubbles keep the figure bounded
+    by regions x severities whatever the number of accidents.
+'''
+import plotly.express as px
+
+from pages.utils.regions import attach
+
+
+def region_bubbles(cube, filters, details=None, labels=None, severity='GRAVITE'):
+    '''
+    Counts the accidents matching `filters` per region and severity.
+
+    Args:
+        cube (Cube): The cube of accident counts
+        filters (dict): Dimension to required value, None meaning no filter
+        details (dict): Dimension to hover label. For each, the bubbles
+            get the most frequent value of the dimension and its share
+        labels (dict): Labels of the dimensions, as for `Cube.count`
+        severity (str): The severity dimension
+    Returns:
+        pd.DataFrame: One row per bubble, with the region (REG_ADM), the
+        severity, the 'count', its 'share' of the accidents of the
+        region, one column per detail, and the 'lat'/'lon' of the region
+    '''
+    by = ['REG_ADM', severity]
+    bubbles = cube.count(by, filters, labels)
+    bubbles['share'] = bubbles['count'] / bubbles.groupby('REG_ADM', observed=True)['count'].transform('sum')
+    for column, label in (details or {}).items():
+        detail = cube.count(by + [column], filters, labels)
+        main = detail.sort_values('count', ascending=False, kind='stable').drop_duplicates(by)
+        main = bubbles[by + ['count']].merge(main, on=by, how='left', suffixes=('', '_main'))
+        share = (main['count_main'] / main['count']).map(' ({:.0%})'.format)
+        bubbles[label] = (main[column].astype(str) + share).where(main[column].notna())
+    return attach(bubbles)
+
+
+def bubble_map(bubbles, region='REG_ADM', severity='GRAVITE', details=None, **kwargs):
+    '''
+    Draws the bubbles of `region_bubbles` on a map, sized by count.
+
+    Args:
+        bubbles (pd.DataFrame): As returned by `region_bubbles`
+        region (str): The region column
+        severity (str): The severity column, one color each
+        details (dict): The details passed to `region_bubbles`
+        **kwargs: Passed to px.scatter_mapbox, e.g. title or zoom
+    Returns:
+        fig: The map
+    '''
+    hover_data = {'count': True, 'share': ':.0%', 'lat': False, 'lon': False}
+    hover_data.update({label: True for label in (details or {}).values()})
+    labels = {'count': 'Accidents', 'share': 'Share of region', **kwargs.pop('labels', {})}
+    return px.scatter_mapbox(bubbles, lat='lat', lon='lon', size='count', color=severity,
+                             hover_name=region, hover_data=hover_data, labels=labels, **kwargs)
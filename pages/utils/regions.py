@@ -0,0 +1,79 @@
+'''
+    Dimension table of the administrative regions (REG_ADM).
+
+    Rows are indexed by the category code of REG_ADM in the shared
+    dataset, so region attributes are joined with a single take on the
+    codes instead of a dictionary lookup per accident. Joining them to
+    per-region aggregates rather than to accident rows is cheaper still.
+'''
+import numpy as np
+import pandas as pd
+
+from pages.utils.dataset import REGION_LABELS
+
+# Approximate centroid of each region, for the maps
+CENTROIDS = {
+    'Bas-Saint-Laurent (01)': (48.5, -68.5),
+    'Saguenay/-Lac-Saint-Jean (02)': (48.4, -71.1),
+    'Capitale-Nationale (03)': (47.0, -71.2),
+    'Mauricie (04)': (46.5, -72.7),
+    'Estrie (05)': (45.4, -71.9),
+    'Montréal (06)': (45.5, -73.6),
+    'Outaouais (07)': (45.6, -76.0),
+    'Abitibi-Témiscamingue (08)': (48.1, -78.0),
+    'Côte-Nord (09)': (50.0, -63.0),
+    'Nord-du-Québec (10)': (52.0, -75.0),
+    'Gaspésie/-Îles-de-la-Madeleine (11)': (49.1, -65.4),
+    'Chaudière-Appalaches (12)': (46.5, -70.5),
+    'Laval (13)': (45.6, -73.8),
+    'Lanaudière (14)': (46.0, -73.4),
+    'Laurentides (15)': (46.5, -74.2),
+    'Montérégie (16)': (45.3, -73.0),
+    'Centre-du-Québec (17)': (46.0, -72.0)
+}
+
+# One row per region, in the category order of REG_ADM:
+# - label: the REG_ADM value, e.g. 'Montréal (06)'
+# - code: the official region number, e.g. '06'
+# - name: the label without its number, e.g. 'Montréal'
+# - lat, lon: the centroid of the region
+REGIONS = pd.DataFrame({
+    'label': REGION_LABELS,
+    'code': [label[-3:-1] for label in REGION_LABELS],
+    'name': [label[:-5] for label in REGION_LABELS],
+    'lat': [CENTROIDS[label][0] for label in REGION_LABELS],
+    'lon': [CENTROIDS[label][1] for label in REGION_LABELS]
+})
+
+
+def lookup(column, field):
+    '''
+    Looks up a numeric region attribute for every value of a REG_ADM
+    column.
+
+    Args:
+        column (pd.Series): A REG_ADM categorical, or a relabelled one
+        field (str): Numeric column of `REGIONS`, e.g. 'lat'
+    Returns:
+        np.ndarray: The attribute of each row, NaN where the region is
+        missing
+    '''
+    # Missing regions have code -1, which picks the appended NaN
+    values = np.append(REGIONS[field].to_numpy(dtype=float), np.nan)
+    return values[column.cat.codes.to_numpy()]
+
+
+def attach(counts, column='REG_ADM', fields=('lat', 'lon')):
+    '''
+    Adds region attributes to aggregated rows, joined on the category
+    code of their region column.
+
+    Args:
+        counts (pd.DataFrame): Aggregates with a REG_ADM categorical
+            (possibly relabelled) column
+        column (str): The region column of `counts`
+        fields (tuple): Columns of `REGIONS` to add
+    Returns:
+        pd.DataFrame: `counts` with the added columns
+    '''
+    return counts.assign(**{field: lookup(counts[column], field) for field in fields})
@@ -0,0 +1,153 @@
+'''
+    Sankey diagrams of the accidents from road characteristics (category,
+    configuration, surface) to their severity, drawn from the cube of
+    counts. Kept here so that the ingest can prerender them (see
+    prerender.py).
+
+    Flows may go through any number of stages: the cube counts the
+    accidents as a dense table with one axis per stage, and
+    `sankey_links` reads the links between consecutive stages from its
+    sums over the other axes, without a loop over the flows.
+'''
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+
+from pages.utils.cube import MISSING
+from pages.utils.labels import SEVERITY_LABELS, SURFACE_STATE_CODES, SURFACE_STATE_LABELS
+
+# Road characteristics the flows of each chart type go through, in order, before the severity
+CHART_STAGES = {
+    'Road Category': ['CD_CATEG_ROUTE'],
+    'Road Configuration': ['CD_CONFG_ROUTE'],
+    'Category → Configuration → Surface': ['CD_CATEG_ROUTE', 'CD_CONFG_ROUTE', 'CD_ETAT_SURFC']
+}
+CHART_TYPES = list(CHART_STAGES)
+
+# Names of the stages, prefixed to their codes when the flows go through several stages,
+# and labels of the codes that have one
+STAGE_NAMES = {
+    'CD_CATEG_ROUTE': 'Category',
+    'CD_CONFG_ROUTE': 'Configuration',
+    'CD_ETAT_SURFC': 'Surface'
+}
+STAGE_LABELS = {
+    'CD_ETAT_SURFC': dict(zip(SURFACE_STATE_CODES, SURFACE_STATE_LABELS))
+}
+
+
+def sankey_links(counts):
+    '''
+    Computes the nodes and links of a Sankey diagram from dense counts.
+
+    Args:
+        counts (np.ndarray): Accident counts with one axis per stage, in
+            flow order (at least two stages)
+    Returns:
+        tuple: The levels of each stage that have accidents (index
+        arrays, the nodes, numbered stage after stage), then the source
+        node, target node and value of each link, as arrays. Links are
+        ordered by stage, source and target.
+    '''
+    stages = range(counts.ndim)
+    kept = [np.flatnonzero(counts.sum(axis=tuple(axis for axis in stages if axis != stage))) for stage in stages]
+    offsets = np.cumsum([0] + [len(levels) for levels in kept])
+    sources, targets, values = [], [], []
+    for stage in stages[:-1]:
+        # Flows between two consecutive stages: the other axes summed out
+        flows = counts.sum(axis=tuple(axis for axis in stages if axis not in (stage, stage + 1)))
+        flows = flows[np.ix_(kept[stage], kept[stage + 1])]
+        source, target = np.nonzero(flows)
+        sources.append(source + offsets[stage])
+        targets.append(target + offsets[stage + 1])
+        values.append(flows[source, target])
+    return kept, np.concatenate(sources), np.concatenate(targets), np.concatenate(values)
+
+
+def _node_label(column, group, prefixed):
+    # Severities are labelled by the cube; road codes are strings, as in the original data
+    if column == 'GRAVITE':
+        return group
+    if group is MISSING:
+        return f"{STAGE_NAMES[column]} Unknown" if prefixed else "Unknown"
+    if group in STAGE_LABELS.get(column, {}):
+        return STAGE_LABELS[column][group]
+    return f"{STAGE_NAMES[column]} {group}" if prefixed else str(group)
+
+
+def create_sankey_chart(cube, chart_type='Road Category'):
+    '''
+    Creates a Sankey diagram to visualize accident flows from
+    road characteristics to severity, with color coding.
+    chart_type: one of CHART_TYPES, e.g. 'Road Category' or 'Road Configuration'
+    '''
+    # st.info(f"Generating Sankey chart for: {chart_type}")
+
+    # Define color map for severities
+    severity_color_map = {
+        "Severe": "darkred",
+        "Minor": "lightgreen",
+        "Material Damage": "steelblue",
+        "Low Damage": "lightgrey",
+        "Other": "gray" # Fallback color
+    }
+
+    # Define a consistent order for severity labels for visualization consistency
+    severity_order = ['Severe', 'Minor', 'Material Damage', 'Low Damage']
+
+    # Accident counts per level of every stage and severity, read from the cube as a dense
+    # table with one axis per stage. Road codes are in their string order, and the accidents
+    # missing one go to an Unknown node last, so that every stage holds the same accidents.
+    stages = CHART_STAGES[chart_type]
+    columns = stages + ['GRAVITE']
+    axes = {column: sorted(cube.levels[column], key=str) + [MISSING] for column in stages}
+    axes['GRAVITE'] = severity_order
+    groups, counts = cube.table(columns, labels={'GRAVITE': SEVERITY_LABELS}, axes=axes, missing=True)
+
+    if not counts.any():
+        fig = go.Figure()
+        fig.update_layout(title="No data to display for this chart.")
+        st.warning(f"No accidents to draw the {chart_type} Sankey chart from.")
+        return fig
+
+    # Nodes are the levels with accidents of each stage, links the nonzero flows between
+    # consecutive stages
+    kept, source, target, value = sankey_links(counts)
+    nodes = [(column, _node_label(column, groups[stage][level], len(stages) > 1))
+             for stage, column in enumerate(columns) for level in kept[stage]]
+    nodes_labels = [label for _, label in nodes]
+
+    # Assign colors to nodes: specific for severities, default for road characteristics,
+    # and color each link by its target node (the severity, for the last stage)
+    nodes_colors = [severity_color_map.get(label, "gray") if column == 'GRAVITE' else "lightgray"
+                    for column, label in nodes]
+    links_colors = np.array(nodes_colors)[target].tolist()
+
+    # Create Sankey diagram figure
+    fig_sankey = go.Figure(data=[go.Sankey(
+        node=dict(
+            pad=15,
+            thickness=20,
+            line=dict(color="black", width=0.5),
+            label=nodes_labels,
+            color=nodes_colors, # Apply specific colors to nodes
+        ),
+        link=dict(
+            source=source.tolist(),
+            target=target.tolist(),
+            value=value.tolist(),
+            color=links_colors, # Apply specific colors to links
+            line=dict(color="lightgray", width=0.5) # Optional: outline for links
+        )
+    )])
+
+    title_text = f"Accident Severity: {chart_type} → Severity"
+    fig_sankey.update_layout(
+        title_text=title_text,
+        font_size=10,
+        height=600,
+        width=900,
+        template="plotly_white"
+    )
+    # st.success(f"Sankey chart '{chart_type}' figure created successfully with custom colors.")
+    return fig_sankey
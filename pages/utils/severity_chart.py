@@ -0,0 +1,26 @@
+'''
+    Bar charts of accident counts per category and severity, drawn from
+    pre-aggregated counts.
+
+    The figures hold one bar per (category, severity) pair. Histograms
+    of the accident rows would embed one value per accident and leave
+    the binning to the browser.
+'''
+import plotly.express as px
+
+
+def severity_bar_chart(counts, x, **kwargs):
+    '''
+    Draws the bars of `counts`, one trace per severity.
+
+    Args:
+        counts (pd.DataFrame): Counts with columns `x`, 'GRAVITE' and
+            'count', as returned by `Cube.count`
+        x (str): The category column
+        **kwargs: Passed to px.bar, e.g. title, labels or barmode
+    Returns:
+        fig: The bar chart
+    '''
+    labels = {'count': 'Number of Accidents', **kwargs.pop('labels', {})}
+    return px.bar(counts, x=x, y='count', color='GRAVITE', labels=labels, **kwargs)
+
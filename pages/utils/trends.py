@@ -0,0 +1,178 @@
+'''
+    Accident trends over the years, before and after the start of the
+    COVID-19 pandemic.
+
+    The series are read from the trend counts stored with the dataset
+    (see `trend_counts`): monthly counts per severity, overall and per
+    value of each of the `TREND_DIMENSIONS`. They are laid out once per
+    data version as dense tables (year x month x severity, plus a value
+    axis per dimension), so the series of a severity and a filter value
+    is a slice and a sum: no copy or scan of the accident rows.
+'''
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from pages.utils.aggregate import count_codes, encode
+from pages.utils.dataset import GRAVITE_LEVELS, TREND_DIMENSIONS, data_version, load_trend_counts
+
+# Start of the COVID-19 period: the first lockdown in Quebec. Yearly
+# series count 2020 as a whole in the period.
+COVID_START = pd.Timestamp('2020-03-01')
+
+RESOLUTIONS = ['Year', 'Month']
+
+# The severity of the 'Severe' series
+SEVERE = 'Mortel ou grave'
+
+
+def _label(labels, dimension, level):
+    return labels[dimension].get(level) if dimension in labels else level
+
+
+def _months(counts):
+    # Month 0 holds the accidents without a month
+    return encode(pd.Series(counts['MS_ACCDN'].to_numpy(dtype='int64', na_value=0)), range(13))[1]
+
+
+class Trends:
+    '''
+    Dense tables of the trend counts.
+
+    Args:
+        counts (pd.DataFrame): The trend counts, see `trend_counts`
+    '''
+
+    def __init__(self, counts):
+        years, year_codes = encode(counts['AN'])
+        self.years = years.tolist()
+        months = _months(counts)
+        severities = encode(counts['GRAVITE'], GRAVITE_LEVELS)[1]
+        weights = counts['count'].to_numpy()
+        shape = (len(self.years), 13, len(GRAVITE_LEVELS))
+
+        # Rows of each grouping set: the overall one sets no dimension
+        sets = counts[TREND_DIMENSIONS].notna().to_numpy()
+        overall = ~sets.any(axis=1)
+        self._tables = {None: count_codes([year_codes[overall], months[overall], severities[overall]],
+                                          shape, weights=weights[overall])}
+        self.levels = {}
+        for column, dimension in enumerate(TREND_DIMENSIONS):
+            rows = sets[:, column]
+            levels, values = encode(counts.loc[rows, dimension])
+            self.levels[dimension] = levels.tolist()
+            self._tables[dimension] = count_codes([year_codes[rows], months[rows], severities[rows], values],
+                                                  shape + (len(levels),), weights=weights[rows])
+
+    def table(self, filters=None, labels=None):
+        '''
+        Args:
+            filters (dict): Dimension to required value, None meaning no
+                filter. Only GRAVITE and one of the `TREND_DIMENSIONS`
+                can be read from the trend counts
+            labels (dict): Dimension to {level: label}, as for the cube
+        Returns:
+            np.ndarray: The counts of the matching accidents per year,
+            month (0 for none) and severity (`GRAVITE_LEVELS`), or None
+            if the filters cannot be read from the trend counts
+        '''
+        labels = labels or {}
+        filters = {dimension: value for dimension, value in (filters or {}).items() if value is not None}
+        severity = filters.pop('GRAVITE', None)
+        if len(filters) > 1 or not set(filters) <= set(TREND_DIMENSIONS):
+            return None
+        if filters:
+            (dimension, value), = filters.items()
+            selected = [index for index, level in enumerate(self.levels[dimension])
+                        if _label(labels, dimension, level) == value]
+            table = self._tables[dimension][..., selected].sum(axis=-1)
+        else:
+            table = self._tables[None]
+        if severity is not None:
+            table = table * np.array([_label(labels, 'GRAVITE', level) == severity for level in GRAVITE_LEVELS])
+        return table
+
+    def cube_table(self, cube, filters=None, labels=None):
+        '''
+        Same as `table`, read from the cube: for filters on several
+        dimensions, which the trend counts do not cover.
+        '''
+        labels = labels or {}
+        severities = [_label(labels, 'GRAVITE', level) for level in GRAVITE_LEVELS]
+        axes = {'AN': self.years, 'MS_ACCDN': range(1, 13), 'GRAVITE': severities}
+        _, yearly = cube.table(['AN', 'GRAVITE'], filters, labels, axes)
+        _, monthly = cube.table(['AN', 'MS_ACCDN', 'GRAVITE'], filters, labels, axes)
+        return np.concatenate([(yearly - monthly.sum(axis=1))[:, np.newaxis], monthly], axis=1)
+
+    def series(self, filters=None, labels=None, resolution='Year', cube=None):
+        '''
+        Total and severe accidents per year or month.
+
+        Args:
+            filters, labels: See `table`
+            resolution (str): 'Year' or 'Month'
+            cube (Cube): Where to count when the filters are not covered
+                by the trend counts
+        Returns:
+            pd.DataFrame: The period ('AN', or 'Month' as the first day
+            of the month) and the 'Total' and 'Severe' counts, including
+            periods without accidents
+        '''
+        table = self.table(filters, labels)
+        if table is None:
+            table = self.cube_table(cube, filters, labels)
+        total = table.sum(axis=-1)
+        severe = table[..., GRAVITE_LEVELS.index(SEVERE)]
+        if resolution == 'Month':
+            months = pd.to_datetime(pd.DataFrame({
+                'year': np.repeat(self.years, 12),
+                'month': np.tile(np.arange(1, 13), len(self.years)),
+                'day': 1
+            }))
+            return pd.DataFrame({'Month': months, 'Total': total[:, 1:].ravel(), 'Severe': severe[:, 1:].ravel()})
+        return pd.DataFrame({'AN': self.years, 'Total': total.sum(axis=1), 'Severe': severe.sum(axis=1)})
+
+
+def covid_summary(series):
+    '''
+    Compares the periods before and after the start of COVID-19.
+
+    Args:
+        series (pd.DataFrame): Yearly or monthly series, from
+            `Trends.series`
+    Returns:
+        pd.DataFrame: For 'Total' and 'Severe', the mean per year (or
+        month) before and after, their difference and its percentage of
+        the mean before
+    '''
+    if 'Month' in series:
+        after = series['Month'] >= COVID_START
+    else:
+        after = series['AN'] >= COVID_START.year
+    values = series[['Total', 'Severe']]
+    before_mean = values[~after].mean()
+    after_mean = values[after].mean()
+    delta = after_mean - before_mean
+    return pd.DataFrame({
+        'Before': before_mean,
+        'After': after_mean,
+        'Delta': delta,
+        'Change (%)': 100 * delta / before_mean.replace(0, np.nan)
+    })
+
+
+@st.cache_resource(max_entries=1)
+def _trends(version):
+    return Trends(load_trend_counts(version))
+
+
+def load_trends(version=None):
+    '''
+    Args:
+        version (DataVersion): The version of the rerun, see
+            `data_version`; resolved again if not given
+    Returns:
+        Trends: The trend tables of the data version, shared by all
+        sessions
+    '''
+    return _trends(version or data_version())
@@ -0,0 +1,72 @@
+'''
+    Counts of the road users involved in the accidents.
+
+    The road-user flags are packed at ingest into the USER_TYPES column,
+    one bit per user type (see `USER_TYPE_FLAGS` in dataset.py), so an
+    accident holds one of 32 combinations of user types. The rows are
+    counted once per combination, with a bincount over that byte; the
+    accidents involving a user type, or several together (e.g.
+    pedestrians and heavy vehicles), are then sums over the combinations
+    holding their bits, read from the 32 counts instead of the rows.
+'''
+import numpy as np
+
+from pages.utils.dataset import USER_TYPE_FLAGS
+
+# Label of each bit of USER_TYPES, in bit order
+USER_TYPE_LABELS = ['Light Vehicles', 'Heavy Vehicles', 'Motorcycles', 'Bicycles', 'Pedestrians']
+COMBINATIONS = 1 << len(USER_TYPE_FLAGS)
+
+# Rows counted per bincount: it converts its input to int64, so counting
+# by blocks bounds that copy to 512 KB whatever the number of accidents
+BLOCK_ROWS = 1 << 16
+
+# Whether each combination (row) holds each user type (column)
+_MEMBERS = (np.arange(COMBINATIONS)[:, np.newaxis] >> np.arange(len(USER_TYPE_FLAGS)) & 1).astype(np.int64)
+
+
+def combination_counts(df, by=None):
+    '''
+    Counts the accidents per combination of user types.
+
+    Args:
+        df (pd.DataFrame): Data with the USER_TYPES column
+        by (str): Categorical column to count per category of, e.g.
+            DAY_NIGHT; accidents missing it are left out
+    Returns:
+        np.ndarray: The int64 counts, indexed by the USER_TYPES value,
+        after an axis of the categories of `by` if given
+    '''
+    bits = df['USER_TYPES'].to_numpy()
+    if by is None:
+        codes, groups = None, 1
+    else:
+        # Missing values (-1) go to group 0, dropped at the end
+        codes = df[by].array.codes
+        groups = len(df[by].cat.categories) + 1
+    counts = np.zeros(groups * COMBINATIONS, dtype=np.int64)
+    for start in range(0, len(bits), BLOCK_ROWS):
+        cells = bits[start:start + BLOCK_ROWS]
+        if codes is not None:
+            cells = (codes[start:start + BLOCK_ROWS] + 1).astype(np.int64) * COMBINATIONS + cells
+        counts += np.bincount(cells, minlength=counts.size)
+    return counts if by is None else counts.reshape(groups, COMBINATIONS)[1:]
+
+
+def type_counts(counts):
+    '''
+    Returns:
+        np.ndarray: The accidents involving each user type, in bit order,
+        from the counts per combination (last axis)
+    '''
+    return counts @ _MEMBERS
+
+
+def pair_counts(counts):
+    '''
+    Returns:
+        np.ndarray: The symmetric matrix of the accidents involving both
+        user types i and j (its diagonal holds `type_counts`), from the
+        counts per combination (a single axis)
+    '''
+    return _MEMBERS.T @ (counts[:, np.newaxis] * _MEMBERS)